@@ -18,3 +18,111 @@ POPULARITY_WEIGHT = 0.20
 MAX_RESULTS_PER_QUERY = 20
 CRAWL_TIMEOUT = 10
 REQUEST_TIMEOUT = 30
+
+# Async crawl settings
+CRAWL_CONCURRENCY = 32
+CRAWL_PER_HOST_CONCURRENCY = 4
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+# Local corpus index
+DATA_DIR = os.getenv("DATA_DIR", "data")
+INDEX_PATH = os.path.join(DATA_DIR, "inverted_index.pkl")
+INDEX_SAVE_INTERVAL = 60  # seconds between saves of a changed index
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Corpus TF-IDF model
+MODEL_DIR = os.path.join(DATA_DIR, "models")
+TFIDF_CORPUS_MAX_FEATURES = 20000
+TFIDF_REFIT_INTERVAL = 300  # seconds between refit checks
+TFIDF_REFIT_MIN_NEW_DOCS = 50
+# Only one process refits; the lease is renewed every interval and must
+# outlast the slowest refit
+TFIDF_REFIT_LEASE = 1800  # seconds
+
+# SerpAPI result cache
+SERP_CACHE_TTL = int(os.getenv("SERP_CACHE_TTL", "21600"))  # seconds
+SERP_CACHE_SIZE = 1000
+SERP_CACHE_PERSIST = os.getenv("SERP_CACHE_PERSIST", "True") == "True"
+
+# Click write-behind buffer
+CLICK_BUFFER_SIZE = 10000  # max queued clicks before backpressure
+CLICK_FLUSH_INTERVAL = 2.0  # seconds
+CLICK_FLUSH_BATCH = 500
+CLICK_ENQUEUE_TIMEOUT = 0.5  # seconds to wait for buffer space
+CLICK_FLUSH_MAX_BACKOFF = 60.0  # seconds between retries while Mongo fails
+
+# CPU-bound work (HTML parsing, TF-IDF fitting); 0 runs it inline
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# BM25 candidates passed to the final ranking in local search mode
+LOCAL_SEARCH_CANDIDATES = 1000
+
+# Ranked result cache
+RESULT_CACHE_TTL = 900  # seconds
+RESULT_CACHE_MAX_ENTRIES = 5000
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Background re-crawl of stale documents
+RECRAWL_INTERVAL = 600  # seconds between cycles
+RECRAWL_MAX_AGE = 7 * 24 * 3600  # seconds before a document is stale
+RECRAWL_BATCH_SIZE = 50
+RECRAWL_SCAN_LIMIT = 1000  # stale documents considered per cycle
+RECRAWL_BATCH_TIMEOUT = 300  # seconds a cycle's crawls may take
+# Only one process re-crawls; the lease is renewed every cycle and covers the
+# sleep between cycles plus the longest batch
+RECRAWL_LEASE = RECRAWL_INTERVAL + RECRAWL_BATCH_TIMEOUT  # seconds
+
+# Crawl job queue: "inline" crawls misses in the request, "queue" hands them
+# to crawl workers (python -m app.workers.crawl_worker)
+CRAWL_MODE = os.getenv("CRAWL_MODE", "inline")
+CRAWL_JOB_LEASE = 120  # seconds before a leased job may be retried
+CRAWL_JOB_MAX_ATTEMPTS = 3
+CRAWL_JOB_RETRY_DELAY = 30  # seconds, doubled on each failed attempt
+CRAWL_WORKER_BATCH = 16  # jobs leased per worker round
+CRAWL_WORKER_POLL_INTERVAL = 1.0  # seconds to wait when the queue is empty
+
+# Pick up documents written by other processes (crawl workers, API workers)
+INDEX_SYNC_INTERVAL = 30  # seconds
+# Re-read window behind the watermark; writes stamped earlier may still be
+# committing
+INDEX_SYNC_LAG = 120  # seconds
+
+# Admin endpoints and on-demand request profiling; disabled without a token
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_BUFFER_SIZE = 50  # most recent profiles kept
+
+# Click rollups and time-decayed popularity
+CLICK_ROLLUP_INTERVAL = 300  # seconds between rollups of click_logs
+CLICK_ROLLUP_LAG = 60  # seconds; newer clicks may still be in flight
+CLICK_DECAY_HALF_LIFE = 7 * 24 * 3600  # seconds for a click's weight to halve
+CLICK_LOG_RETENTION = 30 * 24 * 3600  # seconds raw click logs are kept
+CLICK_HOURLY_BUCKET_RETENTION = 14 * 24 * 3600
+CLICK_DAILY_BUCKET_RETENTION = 400 * 24 * 3600
+
+# Search queries are kept for analytics and suggestions, then expire
+SEARCH_HISTORY_RETENTION = 90 * 24 * 3600  # seconds
+
+# Query suggestions from search_history, held in memory per process
+SUGGEST_REFRESH_INTERVAL = 60  # seconds between incremental refreshes
+SUGGEST_REBUILD_INTERVAL = 24 * 3600  # seconds; full rebuilds drop expired history
+SUGGEST_REFRESH_LAG = 5  # seconds; newer searches may still be in flight
+SUGGEST_TOP_K = 10  # suggestions kept per prefix
+SUGGEST_MAX_PREFIX = 24  # characters indexed per query
+
+# Near-duplicate detection: pages whose word shingles overlap at least this
+# much are collapsed onto the first one stored
+DUPLICATE_MIN_SIMILARITY = 0.8  # estimated Jaccard similarity
+DUPLICATE_SHINGLE_SIZE = 3  # words per shingle
+# Shorter pages (interstitials, "loading" shells) are never classified
+DUPLICATE_MIN_SHINGLES = 50
+DUPLICATE_MINHASH_PERMUTATIONS = 64
+DUPLICATE_LSH_BANDS = 8  # must divide the permutations
+
+# Compression of visible_text and ranking_text in urls documents; "zstd"
+# needs the zstandard package. Documents written with either stay readable.
+TEXT_CODEC = os.getenv("TEXT_CODEC", "zlib")
+TEXT_COMPRESS_MIN_CHARS = 256  # shorter texts are stored as plain strings
+TEXT_ZLIB_LEVEL = 6
@@ -1,15 +1,23 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import MONGO_URI, DATABASE_NAME
+from app.db.schema import ensure_indexes
+from app.utils.metrics import MongoCommandTimer
 import logging
 
 logger = logging.getLogger(__name__)
 
 client = None
 db = None
+shutdown_hooks = []
 
 
-async def connect_to_mongo():
-    """Initialize MongoDB connection"""
+async def connect_to_mongo(ensure_schema: bool = True):
+    """
+    Initialize MongoDB connection
+
+    Args:
+        ensure_schema: Reconcile the declared collections and indexes
+    """
     global client, db
     try:
         # Connect to MongoDB Atlas with proper SSL
@@ -18,6 +26,7 @@ async def connect_to_mongo():
             serverSelectionTimeoutMS=15000,
             connectTimeoutMS=15000,
             retryWrites=True,
+            event_listeners=[MongoCommandTimer()],
         )
         db = client[DATABASE_NAME]
 
@@ -25,30 +34,31 @@ async def connect_to_mongo():
         await db.command("ping")
         logger.info("✅ Connected to MongoDB Atlas")
 
-        # Create collections
-        collections = await db.list_collection_names()
-
-        if "urls" not in collections:
-            await db.create_collection("urls")
-            await db["urls"].create_index("url", unique=True)
-            logger.info("✅ Created 'urls' collection")
-
-        if "click_logs" not in collections:
-            await db.create_collection("click_logs")
-            logger.info("✅ Created 'click_logs' collection")
-
-        if "search_history" not in collections:
-            await db.create_collection("search_history")
-            logger.info("✅ Created 'search_history' collection")
+        if ensure_schema:
+            await ensure_indexes(db)
 
     except Exception as e:
         logger.error(f"❌ Failed to connect to MongoDB: {e}")
         raise
 
 
+def register_shutdown_hook(hook):
+    """Register a coroutine function to await before the connection closes"""
+    if hook not in shutdown_hooks:
+        shutdown_hooks.append(hook)
+
+
 async def close_mongo():
     """Close MongoDB connection"""
     global client
+
+    # Let buffered writers flush while the connection is still open
+    for hook in shutdown_hooks:
+        try:
+            await hook()
+        except Exception as e:
+            logger.error(f"❌ Shutdown hook failed: {e}")
+
     if client:
         client.close()
         logger.info("✅ MongoDB connection closed")
@@ -0,0 +1,101 @@
+"""
+Data migrations for the urls collection
+
+    python -m app.db.migrations ranking_fields
+    python -m app.db.migrations compress_text
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+from app.db import queries
+from app.db.connection import connect_to_mongo, close_mongo
+from app.utils.text_cleaner import build_ranking_fields
+from app.config import TEXT_COMPRESS_MIN_CHARS
+from app.utils.text_codec import COMPRESSED_TEXT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Fields the precomputed ranking fields are built from
+RANKING_SOURCE_FIELDS = ("title", "meta_description", "meta_keywords", "visible_text")
+
+
+async def backfill_ranking_fields(batch_size: int = 500) -> int:
+    """
+    Store ranking_text, token_count and term_freqs on documents missing them
+
+    Returns:
+        Number of documents updated
+    """
+    updated = 0
+    batch = []
+    projection = {field: 1 for field in RANKING_SOURCE_FIELDS}
+    async for doc in queries.iter_urls(
+        {"ranking_text": {"$exists": False}}, projection, batch_size=batch_size
+    ):
+        batch.append((doc["_id"], build_ranking_fields(doc)))
+        if len(batch) >= batch_size:
+            updated += await queries.bulk_update_urls(batch)
+            batch = []
+
+    if batch:
+        updated += await queries.bulk_update_urls(batch)
+
+    logger.info(f"✅ Backfilled ranking fields on {updated} URLs")
+    return updated
+
+
+async def compress_text_fields(batch_size: int = 500) -> int:
+    """
+    Compress large text fields still stored as plain strings
+
+    Optional: plain strings are read as they are, this only saves space.
+
+    Returns:
+        Number of documents updated
+    """
+    updated = 0
+    batch = []
+    # Matches strings of at least TEXT_COMPRESS_MIN_CHARS characters
+    long_text = {"$regex": f"^[\\s\\S]{{{TEXT_COMPRESS_MIN_CHARS},}}"}
+    async for doc in queries.iter_urls(
+        {"$or": [{field: long_text} for field in COMPRESSED_TEXT_FIELDS]},
+        {field: 1 for field in COMPRESSED_TEXT_FIELDS},
+        batch_size=batch_size,
+    ):
+        fields = {k: v for k, v in doc.items() if k in COMPRESSED_TEXT_FIELDS}
+        # bulk_update_urls compresses the fields on the way out
+        batch.append((doc["_id"], fields))
+        if len(batch) >= batch_size:
+            updated += await queries.bulk_update_urls(batch)
+            batch = []
+
+    if batch:
+        updated += await queries.bulk_update_urls(batch)
+
+    logger.info(f"✅ Compressed text fields on {updated} URLs")
+    return updated
+
+
+MIGRATIONS: Dict[str, Callable[[], Awaitable[int]]] = {
+    "ranking_fields": backfill_ranking_fields,
+    "compress_text": compress_text_fields,
+}
+
+
+async def run_migration(name: str) -> int:
+    await connect_to_mongo()
+    try:
+        return await MIGRATIONS[name]()
+    finally:
+        await close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a urls data migration")
+    parser.add_argument("name", choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_migration(args.name))
@@ -1,11 +1,28 @@
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Set
 from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from app.db.connection import get_collection
 from app.models.url import URLModel
+from app.services.inverted_index import get_inverted_index
+from app.services.duplicate_index import get_duplicate_index
+from app.services.result_cache import get_result_cache
+from app.utils.text_cleaner import build_ranking_fields
+from app.utils.text_codec import encode_text_fields
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Large fields a ranked candidate never needs; ranking reads ranking_text
+CANDIDATE_EXCLUDED_FIELDS = {"visible_text": 0, "minhash": 0, "term_freqs": 0}
+
+
+def _write_time() -> datetime:
+    """Current UTC time at the millisecond precision Mongo stores"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
 
 async def insert_url(url_data: Dict[str, Any]) -> Optional[str]:
     """Insert new URL into database"""
@@ -17,7 +34,17 @@ async def insert_url(url_data: Dict[str, Any]) -> Optional[str]:
         if existing:
             return str(existing["_id"])
 
-        result = await urls_collection.insert_one(url_data)
+        if "ranking_text" not in url_data:
+            url_data = {**url_data, **build_ranking_fields(url_data)}
+        now = _write_time()
+        url_data = {**url_data, "last_updated": now, "last_checked": now}
+
+        result = await urls_collection.insert_one(encode_text_fields(url_data))
+
+        # Keep the local corpus and duplicate indexes in step with the collection
+        get_inverted_index().add_document({**url_data, "_id": result.inserted_id})
+        get_duplicate_index().apply_document(url_data)
+
         return str(result.inserted_id)
     except Exception as e:
         logger.error(f"Error inserting URL: {e}")
@@ -44,13 +71,124 @@ async def get_url_by_string(url: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+async def get_urls_by_strings(urls: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch many URLs by URL string in one query, keyed by URL, for ranking"""
+    try:
+        urls_collection = get_collection("urls")
+        cursor = urls_collection.find(
+            {"url": {"$in": list(set(urls))}}, CANDIDATE_EXCLUDED_FIELDS
+        )
+        return {doc["url"]: doc async for doc in cursor}
+    except Exception as e:
+        logger.error(f"Error fetching URLs: {e}")
+        return {}
+
+
+async def get_existing_urls(urls: List[str]) -> Set[str]:
+    """Return which of the given URL strings are stored, from the url index alone"""
+    try:
+        urls_collection = get_collection("urls")
+        cursor = urls_collection.find(
+            {"url": {"$in": list(set(urls))}}, {"_id": 0, "url": 1}
+        )
+        return {doc["url"] async for doc in cursor}
+    except Exception as e:
+        logger.error(f"Error checking URLs: {e}")
+        return set()
+
+
+async def bulk_upsert_urls(
+    url_docs: List[Dict[str, Any]], update_index: bool = True
+) -> Optional[Dict[str, str]]:
+    """
+    Insert many URLs with one unordered bulk write
+
+    Upserts are keyed on the unique url index, so pages stored concurrently
+    by another request are left untouched. Processes other than the API
+    pass update_index=False; API processes pick the documents up through
+    index sync instead.
+
+    Returns:
+        Mapping of URL to document ID for every stored URL, or None if the
+        write failed outright
+    """
+    url_docs = list({doc["url"]: doc for doc in url_docs}.values())
+    if not url_docs:
+        return {}
+
+    # Stamped at write time, not build time, so index sync watermarks
+    # follow commit order
+    now = _write_time()
+    for doc in url_docs:
+        if "ranking_text" not in doc:
+            doc.update(build_ranking_fields(doc))
+        doc["last_updated"] = doc["last_checked"] = now
+
+    try:
+        urls_collection = get_collection("urls")
+        operations = [
+            UpdateOne(
+                {"url": doc["url"]},
+                {
+                    "$setOnInsert": {
+                        k: v for k, v in encode_text_fields(doc).items() if k != "url"
+                    }
+                },
+                upsert=True,
+            )
+            for doc in url_docs
+        ]
+
+        try:
+            result = await urls_collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            # Unordered writes still apply the operations that did not fail
+            logger.warning(
+                f"Bulk URL upsert partially failed: {e.details.get('writeErrors')}"
+            )
+            upserted = {op["index"]: op["_id"] for op in e.details.get("upserted", [])}
+
+        url_ids = {}
+        index = get_inverted_index()
+        duplicate_index = get_duplicate_index()
+        for position, inserted_id in upserted.items():
+            doc = url_docs[position]
+            url_ids[doc["url"]] = str(inserted_id)
+            # Only pages actually stored become canonical for later pages
+            duplicate_index.apply_document(doc)
+            if update_index:
+                index.add_document({**doc, "_id": inserted_id})
+
+        # Resolve URLs that already existed in a single follow-up query
+        existing = [doc["url"] for doc in url_docs if doc["url"] not in url_ids]
+        if existing:
+            cursor = urls_collection.find({"url": {"$in": existing}}, {"url": 1})
+            async for doc in cursor:
+                url_ids[doc["url"]] = str(doc["_id"])
+
+        return url_ids
+
+    except Exception as e:
+        logger.error(f"Error bulk upserting URLs: {e}")
+        return None
+
+
 async def update_url_metadata(url_id: str, metadata: Dict[str, Any]) -> bool:
     """Update URL metadata, vector, and score"""
+    if "last_updated" in metadata:
+        # Re-stamped at write time; callers index the same dict afterwards
+        metadata["last_updated"] = metadata["last_checked"] = _write_time()
+
     try:
         urls_collection = get_collection("urls")
         result = await urls_collection.update_one(
-            {"_id": ObjectId(url_id)}, {"$set": metadata}
+            {"_id": ObjectId(url_id)}, {"$set": encode_text_fields(metadata)}
         )
+
+        # Cached rankings that include this URL are now stale
+        get_result_cache().invalidate_url(url_id)
+
         return result.modified_count > 0
     except Exception as e:
         logger.error(f"Error updating URL: {e}")
@@ -86,6 +224,180 @@ async def log_click(url_id: str) -> bool:
         return False
 
 
+async def get_stale_urls(checked_before: datetime, limit: int) -> List[Dict[str, Any]]:
+    """Fetch re-crawl bookkeeping fields of URLs not checked since a cutoff"""
+    try:
+        urls_collection = get_collection("urls")
+        cursor = (
+            urls_collection.find(
+                {
+                    "$or": [
+                        {"last_checked": {"$lt": checked_before}},
+                        # Documents stored before last_checked existed
+                        {
+                            "last_checked": {"$exists": False},
+                            "last_updated": {"$lt": checked_before},
+                        },
+                        {
+                            "last_checked": {"$exists": False},
+                            "last_updated": {"$exists": False},
+                        },
+                    ]
+                },
+                {
+                    "url": 1,
+                    "etag": 1,
+                    "last_modified": 1,
+                    "last_updated": 1,
+                    "last_checked": 1,
+                    "click_count": 1,
+                    "query_hits": 1,
+                },
+            )
+            .sort("last_checked", 1)
+            .limit(limit)
+        )
+        return await cursor.to_list(None)
+    except Exception as e:
+        logger.error(f"Error fetching stale URLs: {e}")
+        return []
+
+
+async def count_urls_updated_since(since: datetime) -> int:
+    """Count URLs whose content was written after a point in time"""
+    try:
+        urls_collection = get_collection("urls")
+        return await urls_collection.count_documents({"last_updated": {"$gt": since}})
+    except Exception as e:
+        logger.error(f"Error counting updated URLs: {e}")
+        return 0
+
+
+async def touch_url(url_id: Any) -> bool:
+    """
+    Mark a URL as checked without changing its content
+
+    Only last_checked moves: last_updated marks content changes, which
+    drive index sync and corpus refits.
+    """
+    try:
+        urls_collection = get_collection("urls")
+        result = await urls_collection.update_one(
+            {"_id": ObjectId(url_id)}, {"$set": {"last_checked": _write_time()}}
+        )
+        return result.modified_count > 0
+    except Exception as e:
+        logger.error(f"Error touching URL: {e}")
+        return False
+
+
+async def increment_query_hits(url_ids: List[Any]) -> bool:
+    """Count one more appearance of each URL in a query's candidates"""
+    try:
+        urls_collection = get_collection("urls")
+        object_ids = [ObjectId(url_id) for url_id in url_ids]
+        await urls_collection.update_many(
+            {"_id": {"$in": object_ids}}, {"$inc": {"query_hits": 1}}
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error incrementing query hits: {e}")
+        return False
+
+
+async def try_acquire_lease(name: str, owner: str, seconds: float) -> bool:
+    """
+    Acquire or renew a named lease so only one process runs a periodic job
+
+    Returns:
+        True if owner holds the lease until now + seconds
+    """
+    try:
+        job_locks_collection = get_collection("job_locks")
+        now = datetime.utcnow()
+        await job_locks_collection.find_one_and_update(
+            {"_id": name, "$or": [{"lease_until": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return True
+    except DuplicateKeyError:
+        # Another owner holds an unexpired lease
+        return False
+    except Exception as e:
+        logger.error(f"Error acquiring lease {name}: {e}")
+        return False
+
+
+async def get_click_stats(url_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch only the click count and decayed clicks of many URLs, keyed by URL ID"""
+    try:
+        urls_collection = get_collection("urls")
+        object_ids = [
+            ObjectId(url_id) for url_id in url_ids if ObjectId.is_valid(url_id)
+        ]
+        cursor = urls_collection.find(
+            {"_id": {"$in": object_ids}},
+            {"click_count": 1, "decayed_clicks": 1, "decayed_at": 1},
+        )
+        return {str(doc.pop("_id")): doc async for doc in cursor}
+    except Exception as e:
+        logger.error(f"Error fetching click stats: {e}")
+        return {}
+
+
+async def get_existing_url_ids(url_ids: List[str]) -> Optional[Set[str]]:
+    """Return which of the given URL IDs exist, or None on error"""
+    try:
+        urls_collection = get_collection("urls")
+        object_ids = [
+            ObjectId(url_id) for url_id in url_ids if ObjectId.is_valid(url_id)
+        ]
+        cursor = urls_collection.find({"_id": {"$in": object_ids}}, {"_id": 1})
+        return {str(doc["_id"]) async for doc in cursor}
+    except Exception as e:
+        logger.error(f"Error checking URL IDs: {e}")
+        return None
+
+
+async def bulk_increment_click_counts(deltas: Dict[str, int]) -> Optional[int]:
+    """
+    Apply aggregated click count increments with one unordered bulk write
+
+    Returns:
+        Number of URLs modified, or None if the write failed
+    """
+    try:
+        urls_collection = get_collection("urls")
+        operations = [
+            UpdateOne({"_id": ObjectId(url_id)}, {"$inc": {"click_count": count}})
+            for url_id, count in deltas.items()
+        ]
+        result = await urls_collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+    except Exception as e:
+        logger.error(f"Error incrementing click counts: {e}")
+        return None
+
+
+async def log_clicks(events: List[tuple]) -> bool:
+    """Log many (url_id, timestamp) click events in one insert"""
+    try:
+        click_logs_collection = get_collection("click_logs")
+        await click_logs_collection.insert_many(
+            [
+                {"url_id": ObjectId(url_id), "timestamp": timestamp}
+                for url_id, timestamp in events
+            ],
+            ordered=False,
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error logging clicks: {e}")
+        return False
+
+
 async def get_all_urls() -> List[Dict[str, Any]]:
     """Fetch all URLs from database"""
     try:
@@ -96,6 +408,70 @@ async def get_all_urls() -> List[Dict[str, Any]]:
         return []
 
 
+async def get_url_versions() -> Optional[Dict[str, Optional[datetime]]]:
+    """
+    Fetch the last_updated time of every stored URL, keyed by URL ID
+
+    Returns:
+        None on error, so callers never mistake a failed read for an empty
+        collection
+    """
+    try:
+        urls_collection = get_collection("urls")
+        cursor = urls_collection.find({}, {"_id": 1, "last_updated": 1})
+        return {str(doc["_id"]): doc.get("last_updated") async for doc in cursor}
+    except Exception as e:
+        logger.error(f"Error fetching URL versions: {e}")
+        return None
+
+
+async def iter_urls_by_ids(
+    url_ids: Iterable[str], batch_size: int = 500
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream URL documents for the given IDs in batches"""
+    url_ids = list(url_ids)
+    urls_collection = get_collection("urls")
+    for start in range(0, len(url_ids), batch_size):
+        batch = [ObjectId(url_id) for url_id in url_ids[start : start + batch_size]]
+        try:
+            async for doc in urls_collection.find({"_id": {"$in": batch}}):
+                yield doc
+        except Exception as e:
+            logger.error(f"Error fetching URL batch: {e}")
+
+
+async def iter_urls(
+    filter: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: int = 500,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream URL documents without loading the collection into memory"""
+    try:
+        urls_collection = get_collection("urls")
+        cursor = urls_collection.find(filter or {}, projection, batch_size=batch_size)
+        async for doc in cursor:
+            yield doc
+    except Exception as e:
+        logger.error(f"Error streaming URLs: {e}")
+
+
+async def bulk_update_urls(updates: List[tuple], batch_size: int = 1000) -> int:
+    """Apply ($set) field updates to many URLs, given (url_id, fields) pairs"""
+    modified = 0
+    urls_collection = get_collection("urls")
+    for start in range(0, len(updates), batch_size):
+        operations = [
+            UpdateOne({"_id": ObjectId(url_id)}, {"$set": encode_text_fields(fields)})
+            for url_id, fields in updates[start : start + batch_size]
+        ]
+        try:
+            result = await urls_collection.bulk_write(operations, ordered=False)
+            modified += result.modified_count
+        except Exception as e:
+            logger.error(f"Error bulk updating URLs: {e}")
+    return modified
+
+
 async def log_search_query(query: str, result_count: int) -> bool:
     """Log search query for analytics"""
     try:
@@ -111,3 +487,261 @@ async def log_search_query(query: str, result_count: int) -> bool:
     except Exception as e:
         logger.error(f"Error logging search: {e}")
         return False
+
+
+def search_counts_pipeline(start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Aggregation counting searches in [start, end) that returned results"""
+    return [
+        {
+            "$match": {
+                "timestamp": {"$gte": start, "$lt": end},
+                "result_count": {"$gt": 0},
+            }
+        },
+        {"$group": {"_id": "$query", "count": {"$sum": 1}}},
+    ]
+
+
+async def aggregate_search_counts(
+    start: datetime, end: datetime
+) -> Optional[Dict[str, int]]:
+    """Count searches per query text in [start, end); None on failure"""
+    try:
+        search_history_collection = get_collection("search_history")
+        cursor = search_history_collection.aggregate(
+            search_counts_pipeline(start, end), allowDiskUse=True
+        )
+        return {group["_id"]: group["count"] async for group in cursor}
+    except Exception as e:
+        logger.error(f"Error aggregating search history: {e}")
+        return None
+
+
+async def get_serp_cache(query_key: str) -> Optional[List[Dict[str, Any]]]:
+    """Fetch unexpired cached SerpAPI results for a normalized query"""
+    try:
+        serp_cache_collection = get_collection("serp_cache")
+        entry = await serp_cache_collection.find_one(
+            {
+                "_id": query_key,
+                "expires_at": {"$gt": datetime.utcnow()},
+            }
+        )
+        return entry["results"] if entry else None
+    except Exception as e:
+        logger.error(f"Error fetching SerpAPI cache: {e}")
+        return None
+
+
+async def set_serp_cache(
+    query_key: str, results: List[Dict[str, Any]], ttl_seconds: int
+) -> bool:
+    """Store SerpAPI results for a normalized query"""
+    try:
+        serp_cache_collection = get_collection("serp_cache")
+        await serp_cache_collection.replace_one(
+            {"_id": query_key},
+            {
+                "results": results,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds),
+            },
+            upsert=True,
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error storing SerpAPI cache: {e}")
+        return False
+
+
+def click_rollup_pipeline(
+    start: datetime, end: datetime, half_life_seconds: float
+) -> List[Dict[str, Any]]:
+    """Aggregation grouping click logs in [start, end) per URL and hour"""
+    return [
+        {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+        {
+            "$group": {
+                "_id": {
+                    "url_id": "$url_id",
+                    "hour": {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}},
+                },
+                "count": {"$sum": 1},
+                "weight": {
+                    "$sum": {
+                        "$pow": [
+                            0.5,
+                            {
+                                "$divide": [
+                                    {"$subtract": [end, "$timestamp"]},
+                                    half_life_seconds * 1000,
+                                ]
+                            },
+                        ]
+                    }
+                },
+            }
+        },
+    ]
+
+
+async def aggregate_clicks(
+    start: datetime, end: datetime, half_life_seconds: float
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Group click logs in [start, end) per URL and hour
+
+    Each group also carries the clicks' decay weight as of end, the sum of
+    0.5 ** (age / half_life) over its clicks. Returns None on failure.
+    """
+    try:
+        click_logs_collection = get_collection("click_logs")
+        cursor = click_logs_collection.aggregate(
+            click_rollup_pipeline(start, end, half_life_seconds), allowDiskUse=True
+        )
+        return [
+            {
+                "url_id": group["_id"]["url_id"],
+                "hour": group["_id"]["hour"],
+                "count": group["count"],
+                "weight": group["weight"],
+            }
+            async for group in cursor
+        ]
+    except Exception as e:
+        logger.error(f"Error aggregating clicks: {e}")
+        return None
+
+
+async def upsert_click_buckets(buckets: List[Dict[str, Any]], as_of: datetime) -> bool:
+    """
+    Add counts to per-URL click buckets with one unordered bulk write
+
+    Buckets are dicts with url_id, granularity ("hour" or "day"), start,
+    count and expires_at. Each bucket records the rollup (as_of) that last
+    added to it, so retrying a rollup does not count its clicks twice.
+    """
+    if not buckets:
+        return True
+
+    try:
+        click_buckets_collection = get_collection("click_buckets")
+        operations = [
+            UpdateOne(
+                {
+                    "_id": {
+                        "url_id": bucket["url_id"],
+                        "granularity": bucket["granularity"],
+                        "start": bucket["start"],
+                    },
+                    "rolled_up_at": {"$ne": as_of},
+                },
+                {
+                    "$inc": {"count": bucket["count"]},
+                    "$set": {"rolled_up_at": as_of},
+                    "$setOnInsert": {"expires_at": bucket["expires_at"]},
+                },
+                upsert=True,
+            )
+            for bucket in buckets
+        ]
+        try:
+            await click_buckets_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A duplicate key means the bucket already has this rollup applied
+            errors = [
+                error
+                for error in e.details.get("writeErrors", [])
+                if error["code"] != 11000
+            ]
+            if errors:
+                raise
+        return True
+    except Exception as e:
+        logger.error(f"Error storing click buckets: {e}")
+        return False
+
+
+async def apply_decayed_clicks(
+    weights: Dict[Any, float], as_of: datetime, half_life_seconds: float
+) -> bool:
+    """
+    Decay each URL's stored decayed_clicks to as_of and add new click weight
+
+    Runs as a pipeline update so concurrent readers see either the old or
+    the new (decayed_clicks, decayed_at) pair. URLs already decayed to
+    as_of are skipped, so a retried rollup is applied once.
+    """
+    if not weights:
+        return True
+
+    try:
+        urls_collection = get_collection("urls")
+        operations = []
+        for url_id, weight in weights.items():
+            decay = {
+                "$pow": [
+                    0.5,
+                    {
+                        "$divide": [
+                            {
+                                "$subtract": [
+                                    as_of,
+                                    {"$ifNull": ["$decayed_at", as_of]},
+                                ]
+                            },
+                            half_life_seconds * 1000,
+                        ]
+                    },
+                ]
+            }
+            operations.append(
+                UpdateOne(
+                    {"_id": ObjectId(url_id), "decayed_at": {"$not": {"$gte": as_of}}},
+                    [
+                        {
+                            "$set": {
+                                "decayed_clicks": {
+                                    "$add": [
+                                        {
+                                            "$multiply": [
+                                                {"$ifNull": ["$decayed_clicks", 0]},
+                                                decay,
+                                            ]
+                                        },
+                                        weight,
+                                    ]
+                                },
+                                "decayed_at": as_of,
+                            }
+                        }
+                    ],
+                )
+            )
+        await urls_collection.bulk_write(operations, ordered=False)
+        return True
+    except Exception as e:
+        logger.error(f"Error updating decayed clicks: {e}")
+        return False
+
+
+async def get_job_state(name: str) -> Dict[str, Any]:
+    """Fetch the persisted state of a background job"""
+    try:
+        job_state_collection = get_collection("job_state")
+        return await job_state_collection.find_one({"_id": name}) or {}
+    except Exception as e:
+        logger.error(f"Error fetching job state {name}: {e}")
+        return {}
+
+
+async def set_job_state(name: str, state: Dict[str, Any]) -> bool:
+    """Persist ($set) fields of a background job's state"""
+    try:
+        job_state_collection = get_collection("job_state")
+        await job_state_collection.update_one(
+            {"_id": name}, {"$set": state}, upsert=True
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error storing job state {name}: {e}")
+        return False
@@ -0,0 +1,457 @@
+"""
+Declarative indexes for the Mongo collections
+
+The indexes every collection needs are declared in INDEXES and reconciled on
+each startup: missing indexes are created, TTLs are adjusted in place and
+indexes whose options changed are rebuilt. QUERY_SHAPES mirrors the queries
+the app runs so that audit() can explain them and report the ones that scan
+a whole collection.
+
+    python -m app.db.schema sync [--drop-unmanaged]
+    python -m app.db.schema audit
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import CollectionInvalid
+from app.config import (
+    CLICK_LOG_RETENTION,
+    CLICK_DECAY_HALF_LIFE,
+    CRAWL_JOB_MAX_ATTEMPTS,
+    SEARCH_HISTORY_RETENTION,
+)
+
+logger = logging.getLogger(__name__)
+
+# Index options compared when reconciling; anything else is left alone
+MANAGED_OPTIONS = ("unique", "expireAfterSeconds", "partialFilterExpression")
+
+
+@dataclass
+class IndexSpec:
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def matches_keys(self, info: Dict[str, Any]) -> bool:
+        # Directions may come back as floats from indexes built elsewhere
+        keys = [
+            (name, direction if isinstance(direction, str) else int(direction))
+            for name, direction in info["key"].items()
+        ]
+        return keys == self.keys
+
+    def option_changes(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Managed options whose existing value differs from the spec"""
+        return {
+            option: self.options.get(option)
+            for option in MANAGED_OPTIONS
+            if info.get(option) != self.options.get(option)
+        }
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("urls", [("url", 1)], "url_1", {"unique": True}),
+    # Index sync's watermark and corpus refit counts
+    IndexSpec("urls", [("last_updated", 1)], "last_updated_1"),
+    # Stale-document scans of the re-crawler
+    IndexSpec("urls", [("last_checked", 1)], "last_checked_1"),
+    # Covers get_click_stats, so cached rankings refresh popularity from the
+    # index alone
+    IndexSpec(
+        "urls",
+        [("_id", 1), ("click_count", 1), ("decayed_clicks", 1), ("decayed_at", 1)],
+        "click_stats_covering",
+    ),
+    IndexSpec(
+        "click_logs",
+        [("timestamp", 1)],
+        "timestamp_1",
+        {"expireAfterSeconds": CLICK_LOG_RETENTION},
+    ),
+    # Covers the rollup's per-URL, per-hour aggregation
+    IndexSpec("click_logs", [("timestamp", 1), ("url_id", 1)], "click_rollup"),
+    IndexSpec(
+        "click_buckets",
+        [("expires_at", 1)],
+        "expires_at_1",
+        {"expireAfterSeconds": 0},
+    ),
+    IndexSpec(
+        "search_history",
+        [("timestamp", 1)],
+        "timestamp_1",
+        {"expireAfterSeconds": SEARCH_HISTORY_RETENTION},
+    ),
+    IndexSpec(
+        "serp_cache",
+        [("expires_at", 1)],
+        "expires_at_1",
+        {"expireAfterSeconds": 0},
+    ),
+    IndexSpec(
+        "crawl_jobs", [("status", 1), ("available_at", 1)], "status_1_available_at_1"
+    ),
+    # Leases whose worker died are picked up again by expiry
+    IndexSpec(
+        "crawl_jobs", [("status", 1), ("lease_expires", 1)], "status_1_lease_expires_1"
+    ),
+]
+
+# Every managed collection; job_locks and job_state only need their _id index
+COLLECTIONS = sorted({spec.collection for spec in INDEXES} | {"job_locks", "job_state"})
+
+
+async def ensure_indexes(db, drop_unmanaged: bool = False) -> Dict[str, List[str]]:
+    """
+    Reconcile the declared indexes with the database
+
+    Args:
+        db: Motor database
+        drop_unmanaged: Also drop indexes that are not declared
+
+    Returns:
+        Index names per action (created, updated, rebuilt, unmanaged, failed)
+    """
+    report = {
+        "created": [],
+        "updated": [],
+        "rebuilt": [],
+        "unmanaged": [],
+        "failed": [],
+    }
+    existing_collections = set(await db.list_collection_names())
+
+    for collection_name in COLLECTIONS:
+        if collection_name not in existing_collections:
+            try:
+                await db.create_collection(collection_name)
+                logger.info(f"✅ Created '{collection_name}' collection")
+            except CollectionInvalid:
+                # Created by another process starting at the same time
+                pass
+
+        collection = db[collection_name]
+        existing = [info async for info in collection.list_indexes()]
+        specs = [spec for spec in INDEXES if spec.collection == collection_name]
+        managed = {"_id_"}
+
+        for spec in specs:
+            label = f"{collection_name}.{spec.name}"
+            try:
+                info = next((i for i in existing if spec.matches_keys(i)), None)
+                if info is None:
+                    # A stale index may hold the name with other keys
+                    if any(i["name"] == spec.name for i in existing):
+                        await collection.drop_index(spec.name)
+                    await collection.create_index(
+                        spec.keys, name=spec.name, **spec.options
+                    )
+                    report["created"].append(label)
+                    managed.add(spec.name)
+                    continue
+
+                managed.add(info["name"])
+                changes = spec.option_changes(info)
+                if not changes:
+                    continue
+                if (
+                    set(changes) == {"expireAfterSeconds"}
+                    and "expireAfterSeconds" in info
+                ):
+                    # TTLs change in place without rebuilding the index
+                    await db.command(
+                        "collMod",
+                        collection_name,
+                        index={
+                            "name": info["name"],
+                            "expireAfterSeconds": changes["expireAfterSeconds"],
+                        },
+                    )
+                    report["updated"].append(label)
+                else:
+                    await collection.drop_index(info["name"])
+                    await collection.create_index(
+                        spec.keys, name=spec.name, **spec.options
+                    )
+                    managed.add(spec.name)
+                    report["rebuilt"].append(label)
+
+            except Exception as e:
+                # Another process may be reconciling concurrently
+                logger.error(f"❌ Failed to reconcile index {label}: {e}")
+                report["failed"].append(label)
+
+        for info in existing:
+            if info["name"] in managed:
+                continue
+            label = f"{collection_name}.{info['name']}"
+            if drop_unmanaged:
+                await collection.drop_index(info["name"])
+                logger.info(f"🗑️ Dropped unmanaged index {label}")
+            else:
+                report["unmanaged"].append(label)
+
+    for action in ("created", "updated", "rebuilt"):
+        if report[action]:
+            logger.info(f"✅ Indexes {action}: {', '.join(report[action])}")
+    if report["unmanaged"]:
+        logger.warning(f"⚠️ Unmanaged indexes: {', '.join(report['unmanaged'])}")
+    return report
+
+
+@dataclass
+class QueryShape:
+    name: str
+    collection: str
+    # Builds the explain command for the shape
+    command: Callable[[], Dict[str, Any]]
+    # Reads the whole collection by design
+    full_scan: bool = False
+    # Expected to be answered from an index without fetching documents
+    covered: bool = False
+
+
+def _find(collection: str, filter: Dict[str, Any], **options) -> Callable:
+    return lambda: {"find": collection, "filter": filter, **options}
+
+
+def _click_rollup() -> Dict[str, Any]:
+    from app.db.queries import click_rollup_pipeline
+
+    end = datetime.utcnow()
+    return {
+        "aggregate": "click_logs",
+        "pipeline": click_rollup_pipeline(
+            end - timedelta(hours=1), end, CLICK_DECAY_HALF_LIFE
+        ),
+        "cursor": {},
+    }
+
+
+def _suggest_refresh() -> Dict[str, Any]:
+    from app.db.queries import search_counts_pipeline
+
+    end = datetime.utcnow()
+    return {
+        "aggregate": "search_history",
+        "pipeline": search_counts_pipeline(end - timedelta(minutes=1), end),
+        "cursor": {},
+    }
+
+
+def _crawl_lease() -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "find": "crawl_jobs",
+        "filter": {
+            "$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                {
+                    "status": "leased",
+                    "lease_expires": {"$lt": now},
+                    "attempts": {"$lt": CRAWL_JOB_MAX_ATTEMPTS},
+                },
+            ]
+        },
+        "sort": {"available_at": 1},
+        "limit": 1,
+    }
+
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("url_by_url", "urls", _find("urls", {"url": ""})),
+    QueryShape("urls_by_url", "urls", _find("urls", {"url": {"$in": [""]}})),
+    QueryShape(
+        "existing_urls",
+        "urls",
+        _find("urls", {"url": {"$in": [""]}}, projection={"_id": 0, "url": 1}),
+        covered=True,
+    ),
+    QueryShape(
+        "click_stats",
+        "urls",
+        lambda: {
+            "find": "urls",
+            "filter": {"_id": {"$in": [ObjectId()]}},
+            "projection": {"click_count": 1, "decayed_clicks": 1, "decayed_at": 1},
+        },
+        covered=True,
+    ),
+    QueryShape(
+        "stale_urls",
+        "urls",
+        lambda: {
+            "find": "urls",
+            "filter": {
+                "$or": [
+                    {"last_checked": {"$lt": datetime.utcnow()}},
+                    {
+                        "last_checked": {"$exists": False},
+                        "last_updated": {"$lt": datetime.utcnow()},
+                    },
+                    {
+                        "last_checked": {"$exists": False},
+                        "last_updated": {"$exists": False},
+                    },
+                ]
+            },
+            "sort": {"last_checked": 1},
+            "limit": 1,
+        },
+    ),
+    QueryShape(
+        "updated_since",
+        "urls",
+        lambda: {
+            "find": "urls",
+            "filter": {
+                "last_updated": {"$gt": datetime.utcnow()},
+                "pending_crawl": {"$ne": True},
+            },
+        },
+    ),
+    QueryShape(
+        "updated_count",
+        "urls",
+        lambda: {
+            "count": "urls",
+            "query": {"last_updated": {"$gt": datetime.utcnow()}},
+        },
+        covered=True,
+    ),
+    QueryShape(
+        "corpus_refit",
+        "urls",
+        _find(
+            "urls", {"ranking_text": {"$exists": True}}, projection={"ranking_text": 1}
+        ),
+        full_scan=True,
+    ),
+    QueryShape(
+        "duplicate_warm",
+        "urls",
+        _find(
+            "urls",
+            {"minhash": {"$ne": None}, "duplicate_of": None},
+            projection={"url": 1, "minhash": 1},
+        ),
+        full_scan=True,
+    ),
+    QueryShape("click_rollup", "click_logs", _click_rollup, covered=True),
+    QueryShape("crawl_lease", "crawl_jobs", _crawl_lease),
+    QueryShape("suggest_refresh", "search_history", _suggest_refresh),
+]
+
+
+def _winning_plans(explain: Any) -> List[Dict[str, Any]]:
+    """Winning plans anywhere in an explain result (find or aggregate)"""
+    plans = []
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                plans.append(value)
+            else:
+                plans.extend(_winning_plans(value))
+    elif isinstance(explain, list):
+        for value in explain:
+            plans.extend(_winning_plans(value))
+    return plans
+
+
+def _plan_stages(plan: Any, stages: List[str], index_names: List[str]):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if "indexName" in plan:
+            index_names.append(plan["indexName"])
+        for value in plan.values():
+            _plan_stages(value, stages, index_names)
+    elif isinstance(plan, list):
+        for value in plan:
+            _plan_stages(value, stages, index_names)
+
+
+async def audit(db) -> List[Dict[str, Any]]:
+    """
+    Explain every declared query shape and report how it is answered
+
+    A shape is flagged when it scans its collection without being declared
+    a full scan, or fetches documents when it is declared covered.
+    """
+    results = []
+    for shape in QUERY_SHAPES:
+        result = {"name": shape.name, "collection": shape.collection}
+        try:
+            explain = await db.command(
+                "explain", shape.command(), verbosity="queryPlanner"
+            )
+            stages: List[str] = []
+            index_names: List[str] = []
+            for plan in _winning_plans(explain):
+                _plan_stages(plan, stages, index_names)
+
+            collection_scan = "COLLSCAN" in stages
+            covered = not collection_scan and "FETCH" not in stages
+            problems = []
+            if collection_scan and not shape.full_scan:
+                problems.append("collection scan")
+            if shape.covered and not covered:
+                problems.append("not covered")
+
+            result.update(
+                {
+                    "stages": stages,
+                    "indexes": sorted(set(index_names)),
+                    "collection_scan": collection_scan,
+                    "covered": covered,
+                    "problems": problems,
+                }
+            )
+        except Exception as e:
+            result["problems"] = [f"explain failed: {e}"]
+        results.append(result)
+
+    for result in results:
+        if result["problems"]:
+            logger.warning(
+                f"⚠️ Query shape {result['name']}: {', '.join(result['problems'])}"
+            )
+    return results
+
+
+async def _main(command: str, drop_unmanaged: bool) -> Optional[Any]:
+    from app.db import connection
+
+    await connection.connect_to_mongo(ensure_schema=False)
+    try:
+        if command == "sync":
+            return await ensure_indexes(connection.db, drop_unmanaged=drop_unmanaged)
+        return await audit(connection.db)
+    finally:
+        await connection.close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage Mongo indexes")
+    parser.add_argument("command", choices=["sync", "audit"])
+    parser.add_argument(
+        "--drop-unmanaged",
+        action="store_true",
+        help="Drop indexes that are not declared in INDEXES",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(
+        json.dumps(
+            asyncio.run(_main(args.command, args.drop_unmanaged)), indent=2, default=str
+        )
+    )
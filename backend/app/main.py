@@ -1,8 +1,21 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+from datetime import datetime
 from app.db.connection import connect_to_mongo, close_mongo
-from app.routers import search, click
+from app.routers import search, click, admin, suggest
+from app.services.inverted_index import warm_inverted_index, get_inverted_index
+from app.services.duplicate_index import warm_duplicate_index
+from app.services.corpus_model import get_corpus_model
+from app.services.click_buffer import get_click_buffer
+from app.services.cpu_pool import get_cpu_pool
+from app.services.recrawl_scheduler import get_recrawl_scheduler
+from app.services.index_sync import get_index_sync
+from app.services.click_rollup import get_click_rollup
+from app.services.suggest_index import get_suggest_index
+from app.services.crawl_queue import get_crawl_queue
+from app.utils.metrics import render_metrics
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -27,12 +40,28 @@ app.add_middleware(
 # Include routers
 app.include_router(search.router, tags=["search"])
 app.include_router(click.router, tags=["click"])
+app.include_router(suggest.router, tags=["suggest"])
+app.include_router(admin.router, tags=["admin"])
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok"}
+    return {"status": "ok", "cpu_pool": get_cpu_pool().stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for this process"""
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/crawl-queue")
+async def crawl_queue_stats():
+    """Crawl job queue depth per status and lag of the oldest pending job"""
+    return await get_crawl_queue().stats()
 
 
 @app.on_event("startup")
@@ -40,6 +69,17 @@ async def startup():
     """Initialize on startup"""
     logger.info("🚀 Starting Intelligent Search Engine...")
     await connect_to_mongo()
+    # Writes landing during warm-up are picked up by the index sync
+    sync_from = datetime.utcnow()
+    await warm_inverted_index()
+    await warm_duplicate_index()
+    get_inverted_index().start()
+    get_corpus_model().start()
+    get_click_buffer().start()
+    get_recrawl_scheduler().start()
+    get_index_sync().start(sync_from)
+    get_click_rollup().start()
+    get_suggest_index().start()
     logger.info("✅ Application startup complete")
 
 
@@ -47,6 +87,14 @@ async def startup():
 async def shutdown():
     """Cleanup on shutdown"""
     logger.info("🛑 Shutting down...")
+    await get_suggest_index().stop()
+    await get_click_rollup().stop()
+    await get_index_sync().stop()
+    await get_recrawl_scheduler().stop()
+    await get_corpus_model().stop()
+    await search.crawler.close()
+    get_cpu_pool().shutdown()
+    await get_inverted_index().stop()
     await close_mongo()
     logger.info("✅ Application shutdown complete")
 
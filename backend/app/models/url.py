@@ -1,4 +1,4 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from pydantic import BaseModel, Field
 from bson import ObjectId
@@ -10,11 +10,26 @@ class URLModel(BaseModel):
     title: Optional[str] = None
     meta_description: Optional[str] = None
     meta_keywords: Optional[str] = None
-    visible_text: Optional[str] = None
+    # Stored by text_codec: plain below TEXT_COMPRESS_MIN_CHARS, else
+    # marker-prefixed compressed bytes; read through decode_text
+    visible_text: Optional[Union[str, bytes]] = None
     meta_score: float = 0.0
-    tfidf_vector: Optional[List[float]] = None
+    ranking_text: Optional[Union[str, bytes]] = None  # encoded like visible_text
+    token_count: Optional[int] = None  # terms in ranking_text, stopwords removed
+    term_freqs: Optional[Dict[str, int]] = None  # index terms of the full fields
+    tfidf_vector: Optional[List[float]] = None  # non-zero values
+    tfidf_indices: Optional[List[int]] = None  # vocabulary indices of the values
+    tfidf_version: Optional[int] = None
+    minhash: Optional[bytes] = None  # MinHash signature of visible_text
+    duplicate_of: Optional[str] = None  # URL of the page this nearly duplicates
     click_count: int = 0
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
+    decayed_clicks: float = 0.0  # time-decayed clicks as of decayed_at
+    decayed_at: Optional[datetime] = None
+    query_hits: int = 0  # times the URL was a /search candidate
+    etag: Optional[str] = None  # HTTP validators from the last crawl
+    last_modified: Optional[str] = None
+    last_updated: datetime = Field(default_factory=datetime.utcnow)  # content
+    last_checked: Optional[datetime] = None  # last crawl or revalidation
 
     class Config:
         populate_by_name = True
@@ -0,0 +1,53 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.utils.profiler import get_profile_store, is_admin_token
+
+router = APIRouter(prefix="/admin")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests without the admin token"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Summaries of the most recent request profiles, newest first"""
+    return get_profile_store().list()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """Stage timings and stack samples of one request profile"""
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.to_dict()
+
+
+@router.get(
+    "/profiles/{profile_id}/collapsed",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def get_profile_collapsed(profile_id: str):
+    """
+    Stack samples in collapsed format
+
+    Render with flamegraph.pl or load into speedscope.
+    """
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile.collapsed())
+
+
+@router.get("/index-audit", dependencies=[Depends(require_admin)])
+async def index_audit():
+    """Explain the app's query shapes and flag collection scans"""
+    from app.db import connection
+    from app.db.schema import audit
+
+    return await audit(connection.db)
@@ -1,7 +1,8 @@
 import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from app.db import queries
+from bson import ObjectId
+from app.services.click_buffer import get_click_buffer
 
 logger = logging.getLogger(__name__)
 
@@ -17,33 +18,18 @@ async def log_click(request: ClickRequest):
     """
     Log a click on a search result
 
-    Updates popularity score for the URL
+    The click is acknowledged immediately and written to the database by the
+    click buffer, which aggregates popularity updates in bulk
     """
-    try:
-        url_id = request.url_id
-
-        # Verify URL exists
-        url_data = await queries.get_url_by_id(url_id)
-        if not url_data:
-            raise HTTPException(status_code=404, detail="URL not found")
-
-        # Increment click count
-        success = await queries.increment_click_count(url_id)
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to update click count")
-
-        # Log the click event
-        await queries.log_click(url_id)
-
-        logger.info(f"✅ Logged click for URL: {url_data.get('url')}")
-
-        return {
-            "status": "success",
-            "message": "Click recorded",
-            "url_id": url_id,
-            "new_click_count": url_data.get("click_count", 0) + 1,
-        }
-
-    except Exception as e:
-        logger.error(f"❌ Click logging error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    url_id = request.url_id
+    if not ObjectId.is_valid(url_id):
+        raise HTTPException(status_code=400, detail="Invalid URL ID")
+
+    if not await get_click_buffer().record(url_id):
+        raise HTTPException(status_code=503, detail="Click buffer full, retry later")
+
+    return {
+        "status": "success",
+        "message": "Click recorded",
+        "url_id": url_id,
+    }
@@ -1,14 +1,26 @@
+import asyncio
+import json
 import logging
-from fastapi import APIRouter, Query, HTTPException
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Header, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from app.models.url import SearchResultModel
 from app.services.serp_service import get_serp_service
 from app.services.crawler import get_crawler
-from app.services.seo_scoring import get_seo_scorer
-from app.services.tfidf_engine import get_tfidf_engine
+from app.services.tfidf_engine import score_documents
+from app.services.cpu_pool import get_cpu_pool
 from app.services.ranking_engine import get_ranking_engine
+from app.services.inverted_index import get_inverted_index
+from app.services.corpus_model import get_corpus_model
+from app.services.result_cache import get_result_cache
+from app.services.crawl_queue import get_crawl_queue
+from app.services.ingest import build_url_document, build_placeholder_document
+from app.config import MAX_RESULTS_PER_QUERY, LOCAL_SEARCH_CANDIDATES, CRAWL_MODE
 from app.db import queries
-from app.utils.text_cleaner import clean_text
+from app.utils.text_cleaner import get_ranking_text
+from app.utils.metrics import stage_timer
+from app.utils.profiler import is_admin_token, profile_request
 
 logger = logging.getLogger(__name__)
 
@@ -16,150 +28,429 @@ router = APIRouter()
 
 serp_service = get_serp_service()
 crawler = get_crawler()
-seo_scorer = get_seo_scorer()
-tfidf_engine = get_tfidf_engine()
 ranking_engine = get_ranking_engine()
+corpus_model = get_corpus_model()
+result_cache = get_result_cache()
+crawl_queue = get_crawl_queue()
+
+# Fire-and-forget bookkeeping writes, referenced until they finish
+_background_tasks = set()
+
+
+def run_in_background(coro):
+    """Run a coroutine without holding up the response"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def lookup_candidates(
+    serp_results: List[dict],
+) -> Tuple[List[dict], Dict[str, dict]]:
+    """
+    Split SerpAPI results into stored documents and URLs still to crawl
+
+    Returns:
+        (stored URL documents, mapping of uncrawled URL to its SerpAPI result)
+    """
+    # URL variants of the same page are crawled once, as ranked first
+    variants = set()
+    unique_results = []
+    for result in serp_results:
+        url = result.get("url", "")
+        if not url:
+            continue
+        key = serp_service.normalize_url(url)
+        if key not in variants:
+            variants.add(key)
+            unique_results.append(result)
+
+    urls = [result["url"] for result in unique_results]
+    existing_urls = await queries.get_urls_by_strings(urls)
+
+    stored = []
+    misses = {}
+    for result in unique_results:
+        url = result["url"]
+
+        if url in existing_urls:
+            stored.append(existing_urls[url])
+            logger.info(f"📚 Using cached data for {url}")
+        else:
+            misses.setdefault(url, result)
+
+    # Query frequency feeds re-crawl priority
+    if stored:
+        run_in_background(queries.increment_query_hits([doc["_id"] for doc in stored]))
+
+    return stored, misses
+
+
+def collapse_duplicates(items: List[dict]) -> List[dict]:
+    """
+    Keep one document per group of near-duplicates
+
+    A group is a canonical page and the pages marked duplicate_of it. The
+    canonical page is kept if it is among the items, otherwise the first
+    duplicate, in its original position.
+    """
+    kept: Dict[str, int] = {}
+    collapsed = []
+    for item in items:
+        key = item.get("duplicate_of") or item.get("url")
+        position = kept.get(key)
+        if position is None:
+            kept[key] = len(collapsed)
+            collapsed.append(item)
+        elif item.get("url") == key:
+            collapsed[position] = item
+
+    if len(collapsed) < len(items):
+        logger.info(f"🧬 Collapsed {len(items) - len(collapsed)} near-duplicates")
+    return collapsed
+
+
+async def store_new_documents(
+    new_docs: List[dict], update_index: bool = True
+) -> List[dict]:
+    """Store newly crawled pages in one bulk write and return those stored"""
+    if not new_docs:
+        return []
+
+    url_ids = await queries.bulk_upsert_urls(new_docs, update_index) or {}
+    stored = []
+    for url_data in new_docs:
+        url_id = url_ids.get(url_data["url"])
+        if url_id:
+            url_data["_id"] = url_id
+            stored.append(url_data)
+
+    logger.info(f"💾 Stored {len(url_ids)} new URLs in DB")
+    return stored
+
+
+async def enqueue_misses(misses: Dict[str, dict]) -> List[dict]:
+    """
+    Store SerpAPI placeholders for uncrawled URLs and queue their crawls
+
+    Returns:
+        The stored placeholder documents, ranked until crawl workers land
+    """
+    # Placeholders stay out of the inverted index, as they do for index sync,
+    # until a crawl worker stores the page text
+    placeholders = await store_new_documents(
+        [build_placeholder_document(url, result) for url, result in misses.items()],
+        update_index=False,
+    )
+    queued = await crawl_queue.enqueue_many(placeholders)
+    if queued:
+        logger.info(f"⏳ Queued {queued} URLs for crawling")
+    return placeholders
+
+
+async def score_relevance(query: str, items: List[dict]) -> List[float]:
+    """Compute the TF-IDF relevance of URL documents to a query"""
+    if corpus_model.ready:
+        # Only the query is vectorized; documents use stored vectors
+        return await corpus_model.score(query, items)
+
+    # No corpus model yet: fit a throwaway model on this result set
+    documents = [get_ranking_text(item) for item in items]
+    return await get_cpu_pool().run(score_documents, query, documents)
+
+
+async def rank_from_cache(query: str) -> Optional[List[dict]]:
+    """Re-rank a cached candidate set, refreshing only the popularity term"""
+    candidates = result_cache.get(query)
+    if candidates is None:
+        return None
+
+    click_stats = await queries.get_click_stats([c["url_id"] for c in candidates])
+    items = [
+        {**c, "_id": c["url_id"], **click_stats.get(c["url_id"], {})}
+        for c in candidates
+    ]
+    logger.info(f"📚 Ranked result cache hit for query: {query}")
+    return rank_candidates(items, [c["relevance_score"] for c in candidates])
+
+
+def rank_candidates(
+    items: List[dict],
+    relevance_scores: List[float],
+    top_k: int = MAX_RESULTS_PER_QUERY,
+) -> List[dict]:
+    """Combine relevance, SEO and popularity and return the top k results"""
+    # Popularity comes from time-decayed clicks rather than all-time counts
+    now = datetime.utcnow()
+    order, final_scores, popularity_scores = ranking_engine.rank_batch(
+        relevance_scores,
+        [item.get("meta_score") or 0.0 for item in items],
+        [ranking_engine.decayed_clicks(item, now) for item in items],
+        top_k=top_k,
+    )
+
+    results = []
+    for i in order:
+        item = items[i]
+        results.append(
+            {
+                "url_id": str(item.get("_id", "")),
+                "url": item.get("url") or "",
+                "title": item.get("title") or "",
+                "meta_description": item.get("meta_description") or "",
+                "meta_score": item.get("meta_score") or 0.0,
+                "relevance_score": float(relevance_scores[i]),
+                "click_count": item.get("click_count") or 0,
+                "popularity_score": float(popularity_scores[i]),
+                "final_score": float(final_scores[i]),
+            }
+        )
+    return results
 
 
 @router.get("/search", response_model=List[SearchResultModel])
-async def search(query: str = Query(..., min_length=1, max_length=200)):
+async def search(
+    response: Response,
+    query: str = Query(..., min_length=1, max_length=200),
+    mode: str = Query("web", pattern="^(web|local)$"),
+    x_profile: Optional[str] = Header(None),
+):
     """
     Main search endpoint
 
+    mode=web (default):
     1. Fetch URLs from SerpAPI
     2. Crawl each URL
     3. Compute SEO scores
     4. Compute TF-IDF vectors
     5. Rank results
     6. Return ranked results
+
+    mode=local answers from the crawled corpus with BM25, without calling
+    SerpAPI or crawling.
+
+    Sending the admin token as X-Profile profiles the request; the profile
+    id is returned in the X-Profile-Id header and the profile is served
+    under /admin/profiles.
     """
+    if x_profile is None:
+        return await run_search(query, mode)
+
+    if not is_admin_token(x_profile):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+    with profile_request(f"/search?query={query}&mode={mode}") as profile:
+        results = await run_search(query, mode)
+    response.headers["X-Profile-Id"] = profile.id
+    return results
+
+
+async def run_search(query: str, mode: str) -> List[dict]:
+    """Run the search pipeline for a query"""
+    if mode == "local":
+        return await local_search(query)
+
     try:
         logger.info(f"🔍 Processing search query: {query}")
 
+        # Repeated queries only need their popularity scores refreshed
+        with stage_timer("result_cache"):
+            final_results = await rank_from_cache(query)
+        if final_results is not None:
+            await queries.log_search_query(query, len(final_results))
+            return final_results
+
         # Step 1: Fetch URLs from SerpAPI
-        serp_results = serp_service.fetch_urls(query)
+        with stage_timer("serp_fetch"):
+            serp_results = await serp_service.fetch_urls_cached(query)
         if not serp_results:
             logger.warning(f"⚠️ No results from SerpAPI for query: {query}")
             return []
 
         logger.info(f"📍 Got {len(serp_results)} URLs from SerpAPI")
 
-        # Step 2 & 3: Crawl URLs and compute metadata
-        crawled_data = []
-        for result in serp_results:
-            url = result.get("url", "")
-            if not url:
-                continue
+        # Step 2 & 3: Look up all URLs in one query, then crawl the misses
+        with stage_timer("db_lookup"):
+            crawled_data, misses = await lookup_candidates(serp_results)
 
-            # Check if URL already in database
-            existing_url = await queries.get_url_by_string(url)
+        if CRAWL_MODE == "queue":
+            # Crawl workers fill these in; rank SerpAPI data meanwhile
+            with stage_timer("enqueue"):
+                crawled_data.extend(await enqueue_misses(misses))
+        else:
+            # Crawl all cache misses concurrently
+            with stage_timer("crawl"):
+                crawl_results = await crawler.crawl_many(list(misses))
 
-            if existing_url:
-                crawled_data.append(existing_url)
-                logger.info(f"📚 Using cached data for {url}")
-            else:
-                # Crawl the URL
-                crawl_result = crawler.crawl_url(url)
-                if not crawl_result:
-                    logger.warning(f"⚠️ Failed to crawl {url}")
-                    continue
-
-                # Compute SEO score
-                meta_score = seo_scorer.calculate_score(
-                    crawl_result.get("title", ""),
-                    crawl_result.get("meta_description", ""),
-                    crawl_result.get("meta_keywords", ""),
-                    crawl_result.get("visible_text", ""),
-                    url,
-                )
-
-                # Prepare URL data for insertion
-                url_data = {
-                    "url": url,
-                    "title": crawl_result.get("title", result.get("title", "")),
-                    "meta_description": crawl_result.get(
-                        "meta_description", result.get("meta_description", "")
-                    ),
-                    "meta_keywords": crawl_result.get("meta_keywords", ""),
-                    "visible_text": crawl_result.get("visible_text", ""),
-                    "meta_score": meta_score,
-                    "click_count": 0,
-                }
-
-                # Insert into database
-                url_id = await queries.insert_url(url_data)
-                if url_id:
-                    url_data["_id"] = url_id
-                    crawled_data.append(url_data)
-                    logger.info(f"💾 Inserted new URL to DB: {url}")
+            new_docs = []
+            with stage_timer("seo_scoring"):
+                for url, result in misses.items():
+                    crawl_result = crawl_results.get(url)
+                    if not crawl_result:
+                        logger.warning(f"⚠️ Failed to crawl {url}")
+                        continue
+                    new_docs.append(build_url_document(url, crawl_result, result))
+
+            with stage_timer("db_store"):
+                crawled_data.extend(await store_new_documents(new_docs))
 
         if not crawled_data:
             logger.warning(f"⚠️ No URLs were successfully processed")
             return []
 
         logger.info(f"✅ Crawled and stored {len(crawled_data)} URLs")
+        crawled_data = collapse_duplicates(crawled_data)
 
-        # Step 4: Prepare data for TF-IDF ranking
-        documents = []
-        doc_ids = []
-        meta_scores = []
-        click_counts = []
-
-        for item in crawled_data:
-            # Combine title, description, keywords, and visible text for TF-IDF
-            combined_text = " ".join(
-                [
-                    item.get("title", ""),
-                    item.get("meta_description", ""),
-                    item.get("meta_keywords", ""),
-                    item.get("visible_text", "")[:2000],  # Limit text size
-                ]
-            )
+        # Step 4: Compute TF-IDF relevance
+        with stage_timer("tfidf"):
+            relevance_scores = await score_relevance(query, crawled_data)
+        result_cache.put(query, crawled_data, relevance_scores)
+
+        # Step 5: Combine scores and rank
+        with stage_timer("ranking"):
+            final_results = rank_candidates(crawled_data, relevance_scores)
 
-            documents.append(clean_text(combined_text))
-            doc_ids.append(str(item.get("_id", "")))
-            meta_scores.append(item.get("meta_score", 0.0))
-            click_counts.append(item.get("click_count", 0))
+        # Log search query
+        await queries.log_search_query(query, len(final_results))
 
-        # Fit TF-IDF and rank
-        tfidf_engine.fit(documents)
-        ranked_docs = tfidf_engine.rank_documents(query, documents, doc_ids)
+        logger.info(
+            f"✅ Successfully returned {len(final_results)} ranked results for query: {query}"
+        )
 
-        # Step 5: Combine scores and rank
-        results = []
-        max_click_count = max(click_counts) if click_counts else 1
+        return final_results
+
+    except Exception as e:
+        logger.error(f"❌ Search error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search/stream")
+async def search_stream(query: str = Query(..., min_length=1, max_length=200)):
+    """
+    Streaming search endpoint
+
+    Emits newline-delimited JSON events as results become available:
+    1. {"type": "cached", "results": [...]} for URLs already in the database
+    2. {"type": "result", "result": {...}} for each page as its crawl lands
+    3. {"type": "final", "results": [...]} with the final re-ranked ordering
+    """
+    return StreamingResponse(
+        stream_search_events(query), media_type="application/x-ndjson"
+    )
+
+
+def _event(event_type: str, **payload) -> str:
+    """Serialize one NDJSON stream event"""
+    return json.dumps({"type": event_type, **payload}) + "\n"
+
+
+async def stream_search_events(query: str) -> AsyncIterator[str]:
+    """Run the search pipeline, yielding events as each stage produces results"""
+    try:
+        logger.info(f"🔍 Processing streaming search query: {query}")
+
+        final_results = await rank_from_cache(query)
+        if final_results is not None:
+            yield _event("final", results=final_results)
+            await queries.log_search_query(query, len(final_results))
+            return
+
+        serp_results = await serp_service.fetch_urls_cached(query)
+        if not serp_results:
+            logger.warning(f"⚠️ No results from SerpAPI for query: {query}")
+            yield _event("final", results=[])
+            return
 
-        for url_id, relevance_score in ranked_docs:
-            # Find the original data
-            url_data = next(
-                (d for d in crawled_data if str(d.get("_id", "")) == url_id), None
+        candidates, misses = await lookup_candidates(serp_results)
+        if CRAWL_MODE == "queue":
+            candidates.extend(await enqueue_misses(misses))
+            misses = {}
+
+        candidates = collapse_duplicates(candidates)
+        if candidates:
+            relevance_scores = await score_relevance(query, candidates)
+            yield _event(
+                "cached", results=rank_candidates(candidates, relevance_scores)
             )
-            if not url_data:
+
+        new_docs = []
+        async for url, crawl_result in crawler.crawl_as_completed(list(misses)):
+            if not crawl_result:
+                logger.warning(f"⚠️ Failed to crawl {url}")
                 continue
 
-            result = {
-                "url_id": url_id,
-                "url": url_data.get("url", ""),
-                "title": url_data.get("title", ""),
-                "meta_description": url_data.get("meta_description", ""),
-                "meta_score": url_data.get("meta_score", 0.0),
-                "relevance_score": float(relevance_score),
-                "click_count": url_data.get("click_count", 0),
-            }
-            results.append(result)
+            url_data = build_url_document(url, crawl_result, misses[url])
+            new_docs.append(url_data)
 
-        # Apply final ranking
-        final_results = ranking_engine.rank_results(results, max_click_count)
+            # Provisional score; the final event re-ranks everything together
+            if corpus_model.ready:
+                relevance = (await score_relevance(query, [url_data]))[0]
+            else:
+                relevance = (await score_relevance(query, candidates + new_docs))[-1]
+            yield _event("result", result=rank_candidates([url_data], [relevance])[0])
+
+        candidates.extend(await store_new_documents(new_docs))
+        candidates = collapse_duplicates(candidates)
+
+        final_results = []
+        if candidates:
+            relevance_scores = await score_relevance(query, candidates)
+            result_cache.put(query, candidates, relevance_scores)
+            final_results = rank_candidates(candidates, relevance_scores)
+        yield _event("final", results=final_results)
 
-        # Log search query
         await queries.log_search_query(query, len(final_results))
 
-        logger.info(
-            f"✅ Successfully returned {len(final_results)} ranked results for query: {query}"
-        )
+    except Exception as e:
+        logger.error(f"❌ Streaming search error: {e}")
+        yield _event("error", detail=str(e))
+
+
+async def local_search(query: str) -> List[dict]:
+    """Rank the crawled corpus with BM25 from the inverted index"""
+    try:
+        logger.info(f"🔍 Processing local search query: {query}")
+
+        index = get_inverted_index()
+        with stage_timer("local_index"):
+            hits = index.search(query, LOCAL_SEARCH_CANDIDATES)
+        if not hits:
+            return []
+
+        # Normalize BM25 scores to 0-1 so they fit the ranking formula
+        max_score = hits[0][1] or 1.0
+
+        candidates = []
+        relevance_scores = []
+        # Hits come best first, so each near-duplicate group keeps its best
+        groups = set()
+        for url_id, bm25_score in hits:
+            doc = index.get_document(url_id)
+            if not doc:
+                continue
+            group = doc.get("duplicate_of") or doc.get("url")
+            if group in groups:
+                continue
+            groups.add(group)
+            candidates.append({**doc, "_id": url_id})
+            relevance_scores.append(bm25_score / max_score)
+
+        # Click fields in the index date from indexing time; the rollup
+        # updates them in Mongo without re-indexing, as for cached rankings
+        with stage_timer("click_stats"):
+            click_stats = await queries.get_click_stats(
+                [candidate["_id"] for candidate in candidates]
+            )
+        for candidate in candidates:
+            candidate.update(click_stats.get(candidate["_id"], {}))
+
+        with stage_timer("ranking"):
+            final_results = rank_candidates(candidates, relevance_scores)
+
+        await queries.log_search_query(query, len(final_results))
 
         return final_results
 
     except Exception as e:
-        logger.error(f"❌ Search error: {e}")
+        logger.error(f"❌ Local search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query
+from app.config import SUGGEST_TOP_K
+from app.services.suggest_index import get_suggest_index
+
+router = APIRouter()
+
+
+@router.get("/suggest")
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SUGGEST_TOP_K, ge=1, le=SUGGEST_TOP_K),
+):
+    """
+    Autocomplete a partial query from past searches
+
+    Served from the in-memory suggestion index only, most searched first
+    """
+    return {"query": q, "suggestions": get_suggest_index().suggest(q, limit)}
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+from app.config import (
+    CLICK_BUFFER_SIZE,
+    CLICK_FLUSH_INTERVAL,
+    CLICK_FLUSH_BATCH,
+    CLICK_ENQUEUE_TIMEOUT,
+    CLICK_FLUSH_MAX_BACKOFF,
+)
+from app.db import queries
+from app.db.connection import register_shutdown_hook
+
+logger = logging.getLogger(__name__)
+
+# Flush attempts at shutdown before queued clicks are given up
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+
+Click = Tuple[str, datetime]
+
+
+class ClickBuffer:
+    """
+    Write-behind buffer that aggregates clicks and flushes them in bulk
+
+    Clicks drained for a flush that fails are kept and retried first, with
+    exponential backoff between attempts. Counts and logs are retried
+    separately, so a failed click_logs insert never re-applies the counts.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = CLICK_BUFFER_SIZE,
+        flush_interval: float = CLICK_FLUSH_INTERVAL,
+        flush_batch: int = CLICK_FLUSH_BATCH,
+    ):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_pending = max_pending
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        # Clicks not counted yet because a flush failed
+        self._uncounted: List[Click] = []
+        # Clicks counted on urls whose click_logs insert failed
+        self._unlogged: List[Click] = []
+        self._failures = 0
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._uncounted) + len(self._unlogged)
+
+    async def record(self, url_id: str) -> bool:
+        """
+        Queue a click
+
+        Waits briefly for space when the buffer is full and returns False
+        if none frees up, so callers can shed load.
+        """
+        try:
+            await asyncio.wait_for(
+                self._queue.put((url_id, datetime.utcnow())),
+                timeout=CLICK_ENQUEUE_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Click buffer full, rejecting click")
+            return False
+
+        if self._queue.qsize() >= self.flush_batch:
+            self._wakeup.set()
+        return True
+
+    def _drain(self) -> List[Click]:
+        """Take everything currently queued"""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return events
+
+    def _keep(self, kept: List[Click], events: List[Click]) -> int:
+        """Hold clicks for the next flush, dropping the oldest past the cap"""
+        self._failures += 1
+        kept.extend(events)
+        overflow = len(kept) - self.max_pending
+        if overflow > 0:
+            del kept[:overflow]
+            logger.error(f"❌ Dropped {overflow} clicks after repeated flush failures")
+        return 0
+
+    async def flush(self) -> int:
+        """Write queued clicks as aggregated $inc deltas and batched click logs"""
+        if self._unlogged:
+            unlogged, self._unlogged = self._unlogged, []
+            if not await queries.log_clicks(unlogged):
+                return self._keep(self._unlogged, unlogged)
+
+        events = self._uncounted + self._drain()
+        self._uncounted = []
+        if not events:
+            self._failures = 0
+            return 0
+
+        try:
+            deltas = Counter(url_id for url_id, _ in events)
+
+            # Drop clicks for unknown URLs, as the endpoint no longer checks
+            known_ids = await queries.get_existing_url_ids(list(deltas))
+            if known_ids is None:
+                return self._keep(self._uncounted, events)
+            deltas = {url_id: n for url_id, n in deltas.items() if url_id in known_ids}
+            events = [event for event in events if event[0] in known_ids]
+
+            if deltas:
+                if await queries.bulk_increment_click_counts(deltas) is None:
+                    return self._keep(self._uncounted, events)
+                if not await queries.log_clicks(events):
+                    return self._keep(self._unlogged, events)
+
+        except Exception as e:
+            logger.error(f"❌ Error flushing clicks: {e}")
+            return self._keep(self._uncounted, events)
+
+        self._failures = 0
+        logger.info(f"✅ Flushed {len(events)} clicks for {len(deltas)} URLs")
+        return len(events)
+
+    async def _wait(self, event: asyncio.Event, timeout: float):
+        """Wait for an event for at most timeout seconds"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        """Flush every interval, or sooner when a full batch is waiting"""
+        while not self._stopping.is_set():
+            if self._failures:
+                # Back off while Mongo keeps failing, even if batches fill up
+                await self._wait(
+                    self._stopping,
+                    min(
+                        self.flush_interval * 2 ** min(self._failures, 10),
+                        CLICK_FLUSH_MAX_BACKOFF,
+                    ),
+                )
+            else:
+                await self._wait(self._wakeup, self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                # stop() writes out whatever is left
+                return
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Click flush cycle failed: {e}")
+
+    def start(self):
+        """Start periodic flushing and flush once more when Mongo closes"""
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+            register_shutdown_hook(self.stop)
+
+    async def stop(self):
+        """Stop periodic flushing and write out everything still queued"""
+        if self._task:
+            # Signal rather than cancel, so a flush in progress keeps its batch
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        self._failures = 0
+        while self.pending and self._failures < SHUTDOWN_FLUSH_ATTEMPTS:
+            await self.flush()
+        if self.pending:
+            logger.error(f"❌ Lost {self.pending} clicks that could not be flushed")
+
+
+_click_buffer: Optional[ClickBuffer] = None
+
+
+def get_click_buffer() -> ClickBuffer:
+    """Get the process-wide click buffer"""
+    global _click_buffer
+    if _click_buffer is None:
+        _click_buffer = ClickBuffer()
+    return _click_buffer
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from app.config import (
+    CLICK_ROLLUP_INTERVAL,
+    CLICK_ROLLUP_LAG,
+    CLICK_DECAY_HALF_LIFE,
+    CLICK_HOURLY_BUCKET_RETENTION,
+    CLICK_DAILY_BUCKET_RETENTION,
+)
+from app.db import queries
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "click_rollup"
+
+
+class ClickRollup:
+    """
+    Incrementally roll click_logs into click buckets and decayed popularity
+
+    Each run covers click logs from the stored watermark up to a bound a
+    little behind now. Clicks are added to hourly and daily per-URL buckets
+    and folded into each URL's decayed_clicks. The bound is persisted before
+    any writes, so an interrupted run is retried over the same window, and
+    both writes skip work already applied for that bound.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> Dict[str, int]:
+        """Roll up click logs since the watermark"""
+        if not await queries.try_acquire_lease(
+            JOB_NAME, self.owner, CLICK_ROLLUP_INTERVAL
+        ):
+            return {}
+
+        state = await queries.get_job_state(JOB_NAME)
+        start = state.get("watermark", datetime.min)
+        end = state.get("pending_until")
+        if end is None:
+            end = datetime.utcnow() - timedelta(seconds=CLICK_ROLLUP_LAG)
+            if end <= start:
+                return {}
+            await queries.set_job_state(JOB_NAME, {"pending_until": end})
+
+        groups = await queries.aggregate_clicks(start, end, CLICK_DECAY_HALF_LIFE)
+        if groups is None:
+            return {}
+
+        hourly = []
+        daily = defaultdict(int)
+        weights = defaultdict(float)
+        for group in groups:
+            hourly.append(
+                {
+                    "url_id": group["url_id"],
+                    "granularity": "hour",
+                    "start": group["hour"],
+                    "count": group["count"],
+                    "expires_at": group["hour"]
+                    + timedelta(seconds=CLICK_HOURLY_BUCKET_RETENTION),
+                }
+            )
+            day = group["hour"].replace(hour=0)
+            daily[(group["url_id"], day)] += group["count"]
+            weights[group["url_id"]] += group["weight"]
+
+        buckets = hourly + [
+            {
+                "url_id": url_id,
+                "granularity": "day",
+                "start": day,
+                "count": count,
+                "expires_at": day + timedelta(seconds=CLICK_DAILY_BUCKET_RETENTION),
+            }
+            for (url_id, day), count in daily.items()
+        ]
+
+        if not await queries.upsert_click_buckets(buckets, end):
+            return {}
+        if not await queries.apply_decayed_clicks(weights, end, CLICK_DECAY_HALF_LIFE):
+            return {}
+        await queries.set_job_state(JOB_NAME, {"watermark": end, "pending_until": None})
+
+        counts = {
+            "clicks": sum(group["count"] for group in groups),
+            "urls": len(weights),
+        }
+        if groups:
+            logger.info(
+                f"✅ Rolled up {counts['clicks']} clicks for {counts['urls']} URLs"
+            )
+        return counts
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Click rollup failed: {e}")
+            await asyncio.sleep(CLICK_ROLLUP_INTERVAL)
+
+    def start(self):
+        """Start the background rollup loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background rollup loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_click_rollup: Optional[ClickRollup] = None
+
+
+def get_click_rollup() -> ClickRollup:
+    """Get the process-wide click rollup job"""
+    global _click_rollup
+    if _click_rollup is None:
+        _click_rollup = ClickRollup()
+    return _click_rollup
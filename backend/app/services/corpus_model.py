@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import os
+import re
+import shutil
+import socket
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config import (
+    MODEL_DIR,
+    TFIDF_CORPUS_MAX_FEATURES,
+    TFIDF_REFIT_INTERVAL,
+    TFIDF_REFIT_LEASE,
+    TFIDF_REFIT_MIN_NEW_DOCS,
+)
+from app.services.tfidf_engine import TFIDFEngine, fit_engine, transform_documents
+from app.services.cpu_pool import get_cpu_pool
+from app.utils.text_cleaner import get_ranking_text
+from app.utils.sparse_store import SparseMatrixStore
+
+logger = logging.getLogger(__name__)
+
+# Fields the ranking text is built from, for documents stored without one
+RANKING_SOURCE_PROJECTION = {
+    "title": 1,
+    "meta_description": 1,
+    "meta_keywords": 1,
+    "visible_text": 1,
+}
+
+
+JOB_NAME = "corpus_model_refit"
+
+# Model files and matrix directories of a version in MODEL_DIR
+VERSION_FILE = re.compile(r"^tfidf_v(\d+)(?:\.pkl|_matrix)$")
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """One published model version; never modified once built"""
+
+    version: int
+    engine: TFIDFEngine
+    # Document vectors of the fitted corpus, memory-mapped from disk
+    matrix: Optional[SparseMatrixStore]
+
+
+class CorpusModel:
+    """
+    Corpus-level TF-IDF model that is fitted in the background and versioned
+
+    Readers take the current snapshot once and use it throughout, so a new
+    version swapped in mid-request is never mixed with the old one. Only the
+    holder of the refit lease fits new versions; every process, including
+    crawl workers, polls CURRENT and maps the published matrix, which all
+    processes on a host share through the page cache.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR):
+        self.model_dir = model_dir
+        self.snapshot: Optional[ModelSnapshot] = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._refit_lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    @property
+    def version(self) -> int:
+        snapshot = self.snapshot
+        return snapshot.version if snapshot else 0
+
+    @property
+    def engine(self) -> Optional[TFIDFEngine]:
+        snapshot = self.snapshot
+        return snapshot.engine if snapshot else None
+
+    @property
+    def matrix(self) -> Optional[SparseMatrixStore]:
+        snapshot = self.snapshot
+        return snapshot.matrix if snapshot else None
+
+    def _model_path(self, version: int) -> str:
+        return os.path.join(self.model_dir, f"tfidf_v{version}.pkl")
+
+    def _matrix_path(self, version: int) -> str:
+        return os.path.join(self.model_dir, f"tfidf_v{version}_matrix")
+
+    def _current_path(self) -> str:
+        return os.path.join(self.model_dir, "CURRENT")
+
+    def _versions_on_disk(self) -> List[int]:
+        """Versions with a model file or matrix in MODEL_DIR, published or not"""
+        try:
+            names = os.listdir(self.model_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            {int(match.group(1)) for match in map(VERSION_FILE.match, names) if match}
+        )
+
+    def _next_version(self) -> int:
+        """
+        Version number for a new fit
+
+        Above anything on disk, so files left by a publish that failed before
+        CURRENT was updated are never written over.
+        """
+        return max([self.version, *self._versions_on_disk()]) + 1
+
+    def load_latest(self) -> bool:
+        """
+        Swap in the most recently published model version, if it is new
+
+        Cheap when nothing changed: only CURRENT is read.
+        """
+        try:
+            with open(self._current_path()) as f:
+                version = int(f.read().strip())
+        except (OSError, ValueError):
+            return False
+
+        if version <= self.version:
+            return True
+
+        engine = TFIDFEngine.load(self._model_path(version))
+        if engine is None:
+            return False
+
+        # Mapping is near-instant; pages are read from the shared page cache
+        # only when rows are scored
+        matrix = SparseMatrixStore.load(self._matrix_path(version))
+
+        self.snapshot = ModelSnapshot(version, engine, matrix)
+        logger.info(
+            f"✅ Loaded corpus TF-IDF model v{version}"
+            f" ({len(matrix) if matrix else 0} mapped document vectors)"
+        )
+        return True
+
+    def _publish(self, engine: TFIDFEngine) -> bool:
+        """Write a model version next to its matrix, then point CURRENT at it"""
+        if not engine.save(self._model_path(engine.version)):
+            return False
+
+        tmp_path = f"{self._current_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(engine.version))
+        os.replace(tmp_path, self._current_path())
+
+        # Processes still mapping an older matrix keep their pages after the
+        # files are unlinked, so only the previous version is kept around
+        for version in self._versions_on_disk():
+            if version < engine.version - 1:
+                shutil.rmtree(self._matrix_path(version), ignore_errors=True)
+                try:
+                    os.remove(self._model_path(version))
+                except FileNotFoundError:
+                    pass
+        return True
+
+    def vectorize(self, ranking_text: str) -> Dict[str, Any]:
+        """Get the URL document fields holding a document's TF-IDF vector"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {}
+        engine = snapshot.engine
+
+        try:
+            indices, values = engine.get_sparse_vector(ranking_text)
+            return {
+                "tfidf_indices": indices,
+                "tfidf_vector": values,
+                "tfidf_version": engine.version,
+            }
+        except Exception as e:
+            logger.error(f"❌ Error vectorizing document: {e}")
+            return {}
+
+    async def score(self, query: str, items: List[Dict[str, Any]]) -> List[float]:
+        """
+        Score URL documents against a query
+
+        Vectors stored on documents under the current version are used
+        as-is, then rows of the mapped corpus matrix. Only documents found in
+        neither are transformed, in one batch on the CPU pool.
+        """
+        snapshot = self.snapshot
+        engine = snapshot.engine
+        matrix = snapshot.matrix
+        vectors = [None] * len(items)
+        stale = []
+
+        for i, item in enumerate(items):
+            if (
+                item.get("tfidf_version") == engine.version
+                and item.get("tfidf_indices") is not None
+            ):
+                vectors[i] = (item["tfidf_indices"], item.get("tfidf_vector") or [])
+                continue
+
+            row = matrix.row_of(str(item.get("_id", ""))) if matrix else None
+            if row is not None:
+                vectors[i] = matrix.row(row)
+            else:
+                stale.append(i)
+
+        if stale:
+            transformed = await get_cpu_pool().run(
+                transform_documents,
+                self._model_path(snapshot.version),
+                [get_ranking_text(items[i]) for i in stale],
+            )
+            if transformed is None:
+                # Unscored rather than vectorized on the event loop
+                logger.warning(f"⚠️ Could not vectorize {len(stale)} documents")
+                transformed = [([], [])] * len(stale)
+            for i, vector in zip(stale, transformed):
+                vectors[i] = vector
+
+        return engine.score_sparse_vectors(query, vectors)
+
+    async def refit(self) -> bool:
+        """Fit a new model version on the whole corpus and store document vectors"""
+        from app.db import queries
+
+        async with self._refit_lock:
+            # Documents updated from here on count toward the next refit
+            started_at = datetime.utcnow()
+            doc_ids = []
+            texts = []
+            async for doc in queries.iter_urls(
+                {"ranking_text": {"$exists": True}}, {"ranking_text": 1}
+            ):
+                doc_ids.append(doc["_id"])
+                texts.append(get_ranking_text(doc))
+            async for doc in queries.iter_urls(
+                {"ranking_text": {"$exists": False}}, RANKING_SOURCE_PROJECTION
+            ):
+                doc_ids.append(doc["_id"])
+                texts.append(get_ranking_text(doc))
+
+            if len(texts) < 2:
+                logger.info("⏳ Corpus too small to fit TF-IDF model")
+                return False
+
+            # Document vectors go to the mapped matrix store rather than to
+            # every urls document; the fitting process writes it directly
+            version = self._next_version()
+            engine = await get_cpu_pool().run(
+                fit_engine,
+                texts,
+                TFIDF_CORPUS_MAX_FEATURES,
+                version,
+                self._matrix_path(version),
+                [str(doc_id) for doc_id in doc_ids],
+            )
+            if engine is None:
+                return False
+
+            if not await asyncio.to_thread(self._publish, engine):
+                return False
+
+            self.snapshot = ModelSnapshot(
+                engine.version,
+                engine,
+                SparseMatrixStore.load(self._matrix_path(engine.version)),
+            )
+            await queries.set_job_state(
+                JOB_NAME, {"version": engine.version, "fitted_at": started_at}
+            )
+            logger.info(
+                f"✅ Fitted corpus TF-IDF model v{engine.version} on {len(texts)} documents"
+            )
+            return True
+
+    async def needs_refit(self) -> bool:
+        """Whether enough documents changed since the published version was fitted"""
+        from app.db import queries
+
+        if self.snapshot is None:
+            return True
+        state = await queries.get_job_state(JOB_NAME)
+        if state.get("version") != self.version or "fitted_at" not in state:
+            return True
+        changed = await queries.count_urls_updated_since(state["fitted_at"])
+        return changed >= TFIDF_REFIT_MIN_NEW_DOCS
+
+    async def run_once(self) -> bool:
+        """Pick up a newer published version, then refit if this process leads"""
+        from app.db import queries
+
+        self.load_latest()
+        if not await queries.try_acquire_lease(JOB_NAME, self.owner, TFIDF_REFIT_LEASE):
+            return False
+        if not await self.needs_refit():
+            return False
+        return await self.refit()
+
+    async def _run(self):
+        """Poll for new versions and refit periodically"""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Corpus model refit failed: {e}")
+            await asyncio.sleep(TFIDF_REFIT_INTERVAL)
+
+    def start(self):
+        """Load the persisted model and start background refitting"""
+        self.load_latest()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop background refitting"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_corpus_model: Optional[CorpusModel] = None
+
+
+def get_corpus_model() -> CorpusModel:
+    """Get the process-wide corpus model"""
+    global _corpus_model
+    if _corpus_model is None:
+        _corpus_model = CorpusModel()
+    return _corpus_model
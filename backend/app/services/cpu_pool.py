@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from app.config import CPU_POOL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between saturation warnings
+SATURATION_LOG_INTERVAL = 30
+
+
+class CPUPool:
+    """
+    Process pool for CPU-bound stages such as HTML parsing and TF-IDF fitting
+
+    Functions run here must be importable module-level functions, and their
+    arguments and results are pickled between processes, so callers should
+    pass plain strings and lists rather than large objects.
+    With workers=0 work runs inline on the caller. If a worker process dies,
+    the broken pool is replaced and the call retried once.
+    """
+
+    def __init__(self, workers: int = CPU_POOL_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self._last_saturation_log = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the event loop or Mongo client
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        # Concurrent calls all fail on the same broken pool; replace it once
+        if self._executor is executor:
+            logger.error("❌ CPU pool worker died; restarting the pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in the pool without blocking the event loop"""
+        if self.workers <= 0:
+            return fn(*args)
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight > self.workers:
+            now = time.monotonic()
+            if now - self._last_saturation_log > SATURATION_LOG_INTERVAL:
+                self._last_saturation_log = now
+                logger.warning(
+                    f"⚠️ CPU pool saturated: {self.in_flight} tasks for {self.workers} workers"
+                )
+
+        try:
+            loop = asyncio.get_running_loop()
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    if attempt:
+                        raise
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Report pool utilization"""
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.workers),
+            "saturation": self.in_flight / self.workers if self.workers else 0.0,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_cpu_pool: Optional[CPUPool] = None
+
+
+def get_cpu_pool() -> CPUPool:
+    """Get the process-wide CPU pool"""
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = CPUPool()
+    return _cpu_pool
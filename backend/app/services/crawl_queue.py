@@ -0,0 +1,199 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from pymongo import ReturnDocument, UpdateOne
+from app.config import CRAWL_JOB_LEASE, CRAWL_JOB_MAX_ATTEMPTS, CRAWL_JOB_RETRY_DELAY
+from app.db.connection import get_collection
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlQueue:
+    """
+    Durable crawl job queue in the crawl_jobs collection
+
+    Jobs are keyed by URL, so a page is queued at most once. Workers lease
+    jobs for CRAWL_JOB_LEASE seconds; a job whose worker dies is leased again
+    once its lease expires. Completed jobs are deleted, and jobs that keep
+    failing, or keep crashing or hanging their worker, are parked with status
+    "failed".
+    """
+
+    def __init__(self):
+        self.lease_seconds = CRAWL_JOB_LEASE
+        self.max_attempts = CRAWL_JOB_MAX_ATTEMPTS
+
+    def _collection(self):
+        return get_collection("crawl_jobs")
+
+    async def enqueue_many(self, url_docs: List[Dict[str, Any]]) -> int:
+        """Queue crawls for stored URL documents, skipping ones already queued"""
+        if not url_docs:
+            return 0
+
+        try:
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {"_id": doc["url"]},
+                    {
+                        "$setOnInsert": {
+                            "url_id": str(doc["_id"]),
+                            "status": "pending",
+                            "attempts": 0,
+                            "enqueued_at": now,
+                            "available_at": now,
+                        }
+                    },
+                    upsert=True,
+                )
+                for doc in url_docs
+            ]
+            result = await self._collection().bulk_write(operations, ordered=False)
+            return result.upserted_count
+        except Exception as e:
+            logger.error(f"❌ Error enqueueing crawl jobs: {e}")
+            return 0
+
+    async def park_expired(self) -> int:
+        """Park jobs whose last allowed lease expired without fail() being called"""
+        try:
+            now = datetime.utcnow()
+            result = await self._collection().update_many(
+                {
+                    "status": "leased",
+                    "lease_expires": {"$lt": now},
+                    "attempts": {"$gte": self.max_attempts},
+                },
+                {
+                    "$set": {
+                        "status": "failed",
+                        "error": "lease expired",
+                        "failed_at": now,
+                    }
+                },
+            )
+            if result.modified_count:
+                logger.warning(
+                    f"⚠️ Parked {result.modified_count} crawl jobs whose worker "
+                    f"never finished them"
+                )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"❌ Error parking expired crawl jobs: {e}")
+            return 0
+
+    async def lease(self, worker_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to limit runnable jobs for a worker"""
+        jobs = []
+        await self.park_expired()
+        try:
+            for _ in range(limit):
+                now = datetime.utcnow()
+                job = await self._collection().find_one_and_update(
+                    {
+                        "$or": [
+                            {"status": "pending", "available_at": {"$lte": now}},
+                            # Expired leases are retried only while attempts
+                            # remain; park_expired parks the rest
+                            {
+                                "status": "leased",
+                                "lease_expires": {"$lt": now},
+                                "attempts": {"$lt": self.max_attempts},
+                            },
+                        ]
+                    },
+                    {
+                        "$set": {
+                            "status": "leased",
+                            "worker": worker_id,
+                            "leased_at": now,
+                            "lease_expires": now
+                            + timedelta(seconds=self.lease_seconds),
+                        },
+                        "$inc": {"attempts": 1},
+                    },
+                    sort=[("available_at", 1)],
+                    return_document=ReturnDocument.AFTER,
+                )
+                if job is None:
+                    break
+                jobs.append(job)
+        except Exception as e:
+            logger.error(f"❌ Error leasing crawl jobs: {e}")
+        return jobs
+
+    async def complete(self, job: Dict[str, Any]) -> bool:
+        """Remove a finished job, as long as its lease was not taken over"""
+        try:
+            result = await self._collection().delete_one(
+                {"_id": job["_id"], "worker": job["worker"], "status": "leased"}
+            )
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"❌ Error completing crawl job: {e}")
+            return False
+
+    async def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """Schedule a retry with exponential backoff, or park the job as failed"""
+        try:
+            now = datetime.utcnow()
+            if job.get("attempts", 0) >= self.max_attempts:
+                update = {"status": "failed", "error": error, "failed_at": now}
+            else:
+                delay = CRAWL_JOB_RETRY_DELAY * 2 ** (job.get("attempts", 1) - 1)
+                update = {
+                    "status": "pending",
+                    "error": error,
+                    "available_at": now + timedelta(seconds=delay),
+                }
+
+            result = await self._collection().update_one(
+                {"_id": job["_id"], "worker": job["worker"], "status": "leased"},
+                {"$set": update},
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            logger.error(f"❌ Error failing crawl job: {e}")
+            return False
+
+    async def stats(self) -> Dict[str, Any]:
+        """Report queue depth per status and the age of the oldest pending job"""
+        try:
+            counts = {"pending": 0, "leased": 0, "failed": 0}
+            oldest_pending = None
+            async for group in self._collection().aggregate(
+                [
+                    {
+                        "$group": {
+                            "_id": "$status",
+                            "count": {"$sum": 1},
+                            "oldest": {"$min": "$enqueued_at"},
+                        }
+                    }
+                ]
+            ):
+                counts[group["_id"]] = group["count"]
+                if group["_id"] == "pending":
+                    oldest_pending = group["oldest"]
+
+            lag = (
+                (datetime.utcnow() - oldest_pending).total_seconds()
+                if oldest_pending
+                else 0.0
+            )
+            return {**counts, "lag_seconds": lag}
+        except Exception as e:
+            logger.error(f"❌ Error fetching crawl queue stats: {e}")
+            return {}
+
+
+_crawl_queue: Optional[CrawlQueue] = None
+
+
+def get_crawl_queue() -> CrawlQueue:
+    """Get the process-wide crawl queue"""
+    global _crawl_queue
+    if _crawl_queue is None:
+        _crawl_queue = CrawlQueue()
+    return _crawl_queue
@@ -1,9 +1,21 @@
+import asyncio
 import logging
+import time
 import requests
-from typing import Dict, Optional
-from bs4 import BeautifulSoup
-from app.config import CRAWL_TIMEOUT, REQUEST_TIMEOUT
-from app.utils.text_cleaner import extract_visible_text, clean_text
+import aiohttp
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.config import (
+    CRAWL_TIMEOUT,
+    REQUEST_TIMEOUT,
+    CRAWL_CONCURRENCY,
+    CRAWL_PER_HOST_CONCURRENCY,
+    DNS_CACHE_TTL,
+    KEEPALIVE_TIMEOUT,
+)
+from app.utils.text_cleaner import clean_text
+from app.utils.html_extractor import extract_page
+from app.services.cpu_pool import get_cpu_pool
+from app.utils.metrics import CRAWL_SECONDS, CRAWL_FAILURES, host_label
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +28,8 @@ class WebCrawler:
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
 
     def crawl_url(self, url: str) -> Optional[Dict[str, str]]:
         """Fetch and parse URL content"""
@@ -39,36 +53,137 @@ class WebCrawler:
             logger.error(f"❌ Unexpected error crawling {url}: {e}")
             return None
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Lazily create the shared keep-alive session for async crawling"""
+        if self._session is None or self._session.closed:
+            # The connector pools keep-alive connections, caches DNS lookups and
+            # bounds both total and per-host concurrent connections
+            connector = aiohttp.TCPConnector(
+                limit=CRAWL_CONCURRENCY,
+                limit_per_host=CRAWL_PER_HOST_CONCURRENCY,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(
+                    total=REQUEST_TIMEOUT, sock_connect=self.timeout
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(CRAWL_CONCURRENCY)
+        return self._session
+
+    async def crawl_url_async(self, url: str) -> Optional[Dict[str, str]]:
+        """Fetch and parse URL content without blocking the event loop"""
+        _, page = await self.crawl_url_conditional(url)
+        return page
+
+    async def crawl_url_conditional(
+        self,
+        url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Tuple[int, Optional[Dict[str, str]]]:
+        """
+        Fetch and parse URL content, revalidating against stored validators
+
+        Args:
+            url: URL to crawl
+            etag: ETag from the previous crawl, sent as If-None-Match
+            last_modified: Last-Modified from the previous crawl, sent as
+                If-Modified-Since
+
+        Returns:
+            (HTTP status, parsed page). The page also carries the response's
+            etag and last_modified validators. It is None on 304 Not Modified,
+            and on failure, where the status is 0.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        session = self._get_session()
+        host = host_label(url)
+        try:
+            async with self._semaphore:
+                start = time.perf_counter()
+                async with session.get(
+                    url, headers=headers, allow_redirects=True
+                ) as response:
+                    if response.status == 304:
+                        CRAWL_SECONDS.observe(time.perf_counter() - start, host=host)
+                        return 304, None
+                    response.raise_for_status()
+                    html_content = await response.text(errors="replace")
+                    status = response.status
+                    validators = {
+                        "etag": response.headers.get("ETag", ""),
+                        "last_modified": response.headers.get("Last-Modified", ""),
+                    }
+                CRAWL_SECONDS.observe(time.perf_counter() - start, host=host)
+
+            # Parsing is CPU-bound, so it runs in the process pool
+            page = await get_cpu_pool().run(parse_page, html_content, url)
+            page.update(validators)
+            return status, page
+
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Timeout crawling {url}")
+            CRAWL_FAILURES.inc(host=host, reason="timeout")
+            return 0, None
+        except aiohttp.ClientResponseError as e:
+            logger.warning(f"⚠️ Error crawling {url}: {e}")
+            CRAWL_FAILURES.inc(host=host, reason=f"http_{e.status}")
+            return 0, None
+        except aiohttp.ClientError as e:
+            logger.warning(f"⚠️ Error crawling {url}: {e}")
+            CRAWL_FAILURES.inc(host=host, reason="connection")
+            return 0, None
+        except Exception as e:
+            logger.error(f"❌ Unexpected error crawling {url}: {e}")
+            CRAWL_FAILURES.inc(host=host, reason="error")
+            return 0, None
+
+    async def crawl_many(self, urls: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """Crawl many URLs concurrently, keyed by URL"""
+        results = await asyncio.gather(*(self.crawl_url_async(url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def crawl_as_completed(
+        self, urls: List[str]
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, str]]]]:
+        """Crawl many URLs concurrently, yielding (url, result) as each finishes"""
+
+        async def crawl(url: str):
+            return url, await self.crawl_url_async(url)
+
+        tasks = [asyncio.create_task(crawl(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding crawls if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+
+    async def close(self):
+        """Close the shared async session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     def _parse_html(self, html_content: str, url: str) -> Dict[str, str]:
         """Parse HTML and extract metadata and content"""
         try:
-            soup = BeautifulSoup(html_content, "html.parser")
-
-            # Extract title
-            title = ""
-            if soup.title:
-                title = soup.title.string or ""
-            title_tag = soup.find("meta", {"property": "og:title"})
-            if title_tag:
-                title = title_tag.get("content", title)
-
-            # Extract meta description
-            meta_description = ""
-            meta_tag = soup.find("meta", {"name": "description"})
-            if meta_tag:
-                meta_description = meta_tag.get("content", "")
-
-            # Extract keywords
-            meta_keywords = ""
-            keywords_tag = soup.find("meta", {"name": "keywords"})
-            if keywords_tag:
-                meta_keywords = keywords_tag.get("content", "")
-
-            # Extract visible text
-            visible_text = extract_visible_text(html_content)
-
-            # Limit visible text to first 5000 characters for storage efficiency
-            visible_text = visible_text[:5000]
+            # Metadata and visible text are collected in one streaming pass
+            page = extract_page(html_content, max_text_chars=5000)
+            title = page["title"]
+            meta_description = page["meta_description"]
+            meta_keywords = page["meta_keywords"]
+            visible_text = page["visible_text"]
 
             logger.info(f"✅ Crawled {url}")
 
@@ -89,6 +204,14 @@ class WebCrawler:
             }
 
 
+def parse_page(html_content: str, url: str) -> Dict[str, str]:
+    """Parse HTML into URL metadata (process pool entry point)"""
+    return _parser._parse_html(html_content, url)
+
+
+_parser = WebCrawler()
+
+
 def get_crawler() -> WebCrawler:
     """Factory function to get WebCrawler"""
     return WebCrawler()
@@ -0,0 +1,116 @@
+import logging
+from typing import Any, Dict, List, Optional, Set
+import numpy as np
+from app.config import DUPLICATE_LSH_BANDS, DUPLICATE_MIN_SIMILARITY
+from app.utils.minhash import from_bytes, similarity
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateIndex:
+    """
+    LSH index over the MinHash signatures of canonical pages
+
+    Signatures are split into bands, each keying a bucket of URLs. Pages
+    share a bucket with high probability once their similarity nears
+    DUPLICATE_MIN_SIMILARITY, so only URLs sharing a bucket are compared.
+    """
+
+    def __init__(
+        self,
+        bands: int = DUPLICATE_LSH_BANDS,
+        min_similarity: float = DUPLICATE_MIN_SIMILARITY,
+    ):
+        self.bands = bands
+        self.min_similarity = min_similarity
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in np.split(signature, self.bands)]
+
+    def add(self, url: str, signature: np.ndarray):
+        """Index a canonical page, replacing its previous signature"""
+        self.remove(url)
+        self.signatures[url] = signature
+        for buckets, key in zip(self.buckets, self._band_keys(signature)):
+            buckets.setdefault(key, set()).add(url)
+
+    def remove(self, url: str):
+        signature = self.signatures.pop(url, None)
+        if signature is None:
+            return
+        for buckets, key in zip(self.buckets, self._band_keys(signature)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(url)
+                if not bucket:
+                    del buckets[key]
+
+    def find(self, signature: np.ndarray, url: str = "") -> Optional[str]:
+        """Most similar other canonical page above the threshold, if any"""
+        candidates = set()
+        for buckets, key in zip(self.buckets, self._band_keys(signature)):
+            candidates |= buckets.get(key, set())
+        candidates.discard(url)
+
+        best = None
+        for candidate in candidates:
+            score = similarity(signature, self.signatures[candidate])
+            if score >= self.min_similarity and (
+                best is None or (-score, candidate) < best
+            ):
+                best = (-score, candidate)
+        return best[1] if best else None
+
+    def classify(self, url: str, signature: Optional[np.ndarray]) -> Optional[str]:
+        """
+        Classify a freshly crawled page without changing the index
+
+        The page is registered by apply_document once its document is
+        stored, so a failed write never leaves a canonical behind that later
+        pages would point at.
+
+        Returns:
+            URL of the canonical page it duplicates, or None if the page is
+            canonical itself or too short to classify
+        """
+        if signature is None:
+            return None
+        return self.find(signature, url)
+
+    def apply_document(self, doc: Dict[str, Any]):
+        """Mirror a stored urls document written by any process"""
+        signature = from_bytes(doc.get("minhash"))
+        if signature is not None and not doc.get("duplicate_of"):
+            self.add(doc["url"], signature)
+        else:
+            self.remove(doc["url"])
+
+
+_duplicate_index: Optional[DuplicateIndex] = None
+
+
+def get_duplicate_index() -> DuplicateIndex:
+    """Get the process-wide duplicate index"""
+    global _duplicate_index
+    if _duplicate_index is None:
+        _duplicate_index = DuplicateIndex()
+    return _duplicate_index
+
+
+async def warm_duplicate_index() -> DuplicateIndex:
+    """Load the signatures of canonical pages from the urls collection"""
+    from app.db import queries
+
+    index = get_duplicate_index()
+    async for doc in queries.iter_urls(
+        {"minhash": {"$ne": None}, "duplicate_of": None}, {"url": 1, "minhash": 1}
+    ):
+        index.apply_document(doc)
+
+    logger.info(f"✅ Duplicate index ready: {len(index)} signatures")
+    return index
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import INDEX_SYNC_INTERVAL, INDEX_SYNC_LAG
+from app.db import queries
+from app.services.inverted_index import get_inverted_index
+from app.services.duplicate_index import get_duplicate_index
+from app.services.result_cache import get_result_cache
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSync:
+    """
+    Fold documents written by other processes into this process's state
+
+    Crawl workers and other API workers update urls documents directly in
+    Mongo. Each cycle re-indexes documents updated since the last one and
+    drops cached rankings that include them, whatever fields changed.
+
+    last_updated is stamped just before a write commits, so a write can
+    land after a later-stamped one has advanced the watermark. Each cycle
+    re-reads INDEX_SYNC_LAG seconds behind the watermark and skips
+    documents already indexed at the same last_updated.
+    """
+
+    def __init__(self):
+        self.watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Apply documents updated since the watermark"""
+        index = get_inverted_index()
+        duplicate_index = get_duplicate_index()
+        result_cache = get_result_cache()
+
+        if self.watermark is None:
+            self.watermark = datetime.utcnow()
+        since = self.watermark - timedelta(seconds=INDEX_SYNC_LAG)
+
+        synced = 0
+        async for doc in queries.iter_urls(
+            {"last_updated": {"$gt": since}, "pending_crawl": {"$ne": True}}
+        ):
+            doc_id = str(doc["_id"])
+            before = index.get_document(doc_id)
+            # This process's own writes come back too, already applied
+            if before is not None and before.get("last_updated") == doc["last_updated"]:
+                continue
+
+            index.add_document(doc)
+            duplicate_index.apply_document(doc)
+            # A re-crawl may change only the body text, which stored fields
+            # do not show, so any new version drops cached rankings with it
+            result_cache.invalidate_url(doc_id)
+            self.watermark = max(self.watermark, doc["last_updated"])
+            synced += 1
+
+        if synced:
+            logger.info(f"🔄 Synced {synced} updated URLs into the index")
+        return synced
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(INDEX_SYNC_INTERVAL)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Index sync failed: {e}")
+
+    def start(self, since: Optional[datetime] = None):
+        """
+        Start the background sync loop
+
+        Args:
+            since: When warm-up began reading the collection; documents
+                written after it are synced
+        """
+        if self.watermark is None:
+            self.watermark = since or datetime.utcnow()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background sync loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_index_sync: Optional[IndexSync] = None
+
+
+def get_index_sync() -> IndexSync:
+    """Get the process-wide index sync"""
+    global _index_sync
+    if _index_sync is None:
+        _index_sync = IndexSync()
+    return _index_sync
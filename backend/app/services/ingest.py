@@ -0,0 +1,97 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from app.services.seo_scoring import get_seo_scorer
+from app.services.corpus_model import get_corpus_model
+from app.services.duplicate_index import get_duplicate_index
+from app.utils.minhash import minhash, to_bytes
+from app.utils.text_cleaner import build_ranking_fields, clean_text
+
+logger = logging.getLogger(__name__)
+
+seo_scorer = get_seo_scorer()
+corpus_model = get_corpus_model()
+duplicate_index = get_duplicate_index()
+
+# Fields owned by the document rather than by a particular crawl
+IDENTITY_FIELDS = ("_id", "url", "click_count")
+
+
+def build_url_document(
+    url: str, crawl_result: Dict[str, str], serp_result: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Score a crawled page and build its urls document
+
+    The page is also classified against the duplicate index; it is
+    registered there by the write that stores it.
+    """
+    serp_result = serp_result or {}
+
+    # Compute SEO score
+    meta_score = seo_scorer.calculate_score(
+        crawl_result.get("title", ""),
+        crawl_result.get("meta_description", ""),
+        crawl_result.get("meta_keywords", ""),
+        crawl_result.get("visible_text", ""),
+        url,
+    )
+
+    url_data = {
+        # Assigned up front so results can be served before they are stored
+        "_id": ObjectId(),
+        "url": url,
+        "title": crawl_result.get("title", serp_result.get("title", "")),
+        "meta_description": crawl_result.get(
+            "meta_description", serp_result.get("meta_description", "")
+        ),
+        "meta_keywords": crawl_result.get("meta_keywords", ""),
+        "visible_text": crawl_result.get("visible_text", ""),
+        "meta_score": meta_score,
+        "click_count": 0,
+        "etag": crawl_result.get("etag", ""),
+        "last_modified": crawl_result.get("last_modified", ""),
+        "last_updated": datetime.utcnow(),
+        "pending_crawl": False,
+    }
+
+    # Near-duplicates of a stored page point at it and drop their text,
+    # which the canonical page already holds
+    signature = minhash(url_data["visible_text"])
+    url_data["minhash"] = to_bytes(signature)
+    url_data["duplicate_of"] = duplicate_index.classify(url, signature)
+    if url_data["duplicate_of"]:
+        url_data["visible_text"] = ""
+
+    # Normalize the ranking text once, then store its vector under the
+    # current corpus model
+    url_data.update(build_ranking_fields(url_data))
+    url_data.update(corpus_model.vectorize(url_data["ranking_text"]))
+    return url_data
+
+
+def build_recrawl_update(url: str, crawl_result: Dict[str, str]) -> Dict[str, Any]:
+    """Build the fields to $set on an existing urls document after a re-crawl"""
+    url_data = build_url_document(url, crawl_result)
+    return {k: v for k, v in url_data.items() if k not in IDENTITY_FIELDS}
+
+
+def build_placeholder_document(url: str, serp_result: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Build a urls document from SerpAPI data for a page not crawled yet
+
+    The title and snippet stand in for the page until a crawl worker fills
+    in the document and clears pending_crawl.
+    """
+    url_data = build_url_document(
+        url,
+        {
+            "title": clean_text(serp_result.get("title", ""))[:200],
+            "meta_description": clean_text(serp_result.get("meta_description", ""))[
+                :500
+            ],
+        },
+    )
+    url_data["pending_crawl"] = True
+    return url_data
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import math
+import os
+import pickle
+import heapq
+import tempfile
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import INDEX_PATH, INDEX_SAVE_INTERVAL, BM25_K1, BM25_B
+from app.utils.tokenizer import tokenize
+from app.utils.text_cleaner import build_index_terms, remove_stopwords
+
+logger = logging.getLogger(__name__)
+
+# Document fields kept in the index so results can be served without Mongo
+STORED_FIELDS = (
+    "url",
+    "title",
+    "meta_description",
+    "meta_score",
+    "click_count",
+    "decayed_clicks",
+    "decayed_at",
+    "duplicate_of",
+    "last_updated",
+)
+
+
+class InvertedIndex:
+    """
+    Corpus-wide inverted index over the urls collection with BM25 scoring
+
+    Changes are persisted on a timer from a worker thread. While a save is
+    pickling the index, writes are queued and applied once it finishes, so
+    the thread never sees the index mutate under it.
+    """
+
+    def __init__(self, path: str = INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+        self._pending_writes = 0
+        self._saving = False
+        self._deferred: List[Tuple[Callable[[Any], bool], Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @staticmethod
+    def analyze(text: str) -> List[str]:
+        """Tokenize text into index terms"""
+        return remove_stopwords(tokenize(text))
+
+    def add_document(self, doc: Dict[str, Any]) -> bool:
+        """Add or replace a document in the index"""
+        if self._saving:
+            self._deferred.append((self.add_document, doc))
+            return True
+
+        try:
+            doc_id = str(doc["_id"])
+            if doc_id in self.doc_lengths:
+                self.remove_document(doc_id)
+
+            # Term statistics are precomputed at ingest time; legacy
+            # documents are analyzed here the same way
+            term_freqs = doc.get("term_freqs")
+            if term_freqs is None:
+                term_freqs = Counter(build_index_terms(doc))
+            doc_length = sum(term_freqs.values())
+
+            for term, tf in term_freqs.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+            self.doc_lengths[doc_id] = doc_length
+            self.doc_terms[doc_id] = tuple(term_freqs)
+            self.documents[doc_id] = {field: doc.get(field) for field in STORED_FIELDS}
+            self.total_length += doc_length
+
+            self._pending_writes += 1
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Error indexing document: {e}")
+            return False
+
+    def remove_document(self, doc_id: str) -> bool:
+        """Remove a document from the index"""
+        if self._saving:
+            self._deferred.append((self.remove_document, doc_id))
+            return doc_id in self.doc_lengths
+
+        if doc_id not in self.doc_lengths:
+            return False
+
+        for term in self.doc_terms.pop(doc_id, ()):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.documents.pop(doc_id, None)
+        self._pending_writes += 1
+        return True
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Score documents against a query with BM25
+
+        Args:
+            query: Search query
+            top_k: Number of results to return
+
+        Returns:
+            List of (doc_id, bm25_score) tuples, sorted by score
+        """
+        num_docs = len(self.doc_lengths)
+        if not num_docs:
+            return []
+
+        avg_length = self.total_length / num_docs or 1.0
+        scores: Dict[str, float] = {}
+
+        for term in set(self.analyze(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            df = len(postings)
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length
+                )
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (
+                    tf + norm
+                )
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored fields of an indexed document"""
+        return self.documents.get(doc_id)
+
+    def save(self) -> bool:
+        """Persist the index to disk atomically; blocks while pickling"""
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            state = {
+                "postings": self.postings,
+                "doc_lengths": self.doc_lengths,
+                "doc_terms": self.doc_terms,
+                "documents": self.documents,
+                "total_length": self.total_length,
+            }
+            # Every worker saves to the same path; a private temp file keeps
+            # concurrent saves from interleaving before the rename
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp"
+            )
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+
+            self._pending_writes = 0
+            logger.info(f"💾 Saved inverted index with {len(self)} documents")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Error saving inverted index: {e}")
+            return False
+
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    async def save_async(self) -> bool:
+        """Persist the index from a worker thread, queueing writes meanwhile"""
+        if self._saving:
+            return False
+
+        self._saving = True
+        try:
+            return await asyncio.to_thread(self.save)
+        finally:
+            self._saving = False
+            deferred, self._deferred = self._deferred, []
+            for apply, arg in deferred:
+                apply(arg)
+
+    def load(self) -> bool:
+        """Load the index from disk"""
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+
+            self.postings = state["postings"]
+            self.doc_lengths = state["doc_lengths"]
+            self.doc_terms = state["doc_terms"]
+            self.documents = state["documents"]
+            self.total_length = state["total_length"]
+            self._pending_writes = 0
+
+            logger.info(f"✅ Loaded inverted index with {len(self)} documents")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Error loading inverted index: {e}")
+            return False
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(INDEX_SAVE_INTERVAL)
+            try:
+                if self._pending_writes:
+                    await self.save_async()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Inverted index save failed: {e}")
+
+    def start(self):
+        """Save the index in the background whenever it has changed"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop background saving and persist outstanding changes"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending_writes:
+            await self.save_async()
+
+
+_inverted_index: Optional[InvertedIndex] = None
+
+
+def get_inverted_index() -> InvertedIndex:
+    """Get the process-wide inverted index"""
+    global _inverted_index
+    if _inverted_index is None:
+        _inverted_index = InvertedIndex()
+    return _inverted_index
+
+
+async def warm_inverted_index() -> InvertedIndex:
+    """Load the persisted index and reconcile it with the urls collection"""
+    from app.db import queries
+
+    index = get_inverted_index()
+    index.load()
+
+    versions = await queries.get_url_versions()
+    if versions is None:
+        logger.warning("⚠️ Could not reconcile the inverted index with Mongo")
+        return index
+
+    stale_ids = set(index.doc_lengths) - set(versions)
+    for doc_id in stale_ids:
+        index.remove_document(doc_id)
+
+    # Missing documents, and documents re-crawled since the index was saved
+    changed_ids = [
+        doc_id
+        for doc_id, last_updated in versions.items()
+        if doc_id not in index.documents
+        or index.documents[doc_id].get("last_updated") != last_updated
+    ]
+    async for doc in queries.iter_urls_by_ids(changed_ids):
+        index.add_document(doc)
+
+    if stale_ids or changed_ids:
+        await index.save_async()
+
+    logger.info(
+        f"✅ Inverted index ready: {len(index)} documents "
+        f"({len(changed_ids)} added or refreshed, {len(stale_ids)} removed)"
+    )
+    return index
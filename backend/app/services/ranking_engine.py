@@ -1,6 +1,13 @@
 import logging
-from typing import List, Dict, Tuple, Optional
-from app.config import TFIDF_WEIGHT, SEO_WEIGHT, POPULARITY_WEIGHT
+import numpy as np
+from datetime import datetime
+from typing import Any, List, Dict, Tuple, Optional, Sequence
+from app.config import (
+    TFIDF_WEIGHT,
+    SEO_WEIGHT,
+    POPULARITY_WEIGHT,
+    CLICK_DECAY_HALF_LIFE,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +88,75 @@ class RankingEngine:
             logger.error(f"❌ Error ranking results: {e}")
             return results
 
+    @staticmethod
+    def decayed_clicks(doc: Dict[str, Any], now: datetime) -> float:
+        """
+        Time-decayed click count of a URL document as of now
+
+        The click rollup stores decayed_clicks as of decayed_at, so reading
+        it only needs one more decay step.
+        """
+        decayed_clicks = doc.get("decayed_clicks")
+        if not decayed_clicks:
+            return 0.0
+
+        age = (now - doc.get("decayed_at", now)).total_seconds()
+        return decayed_clicks * 0.5 ** (max(age, 0.0) / CLICK_DECAY_HALF_LIFE)
+
+    @staticmethod
+    def rank_batch(
+        relevance_scores: Sequence[float],
+        seo_scores: Sequence[float],
+        click_counts: Sequence[float],
+        top_k: Optional[int] = None,
+        max_click_count: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Rank columnar score arrays in one vectorized pass
+
+        Uses the same formula as calculate_final_score.
+
+        Args:
+            relevance_scores: TF-IDF relevance scores (0-1)
+            seo_scores: SEO meta scores (0-100)
+            click_counts: Click counts, raw or time-decayed
+            top_k: Number of results to select, or all if None
+            max_click_count: Click count normalizer, defaults to the batch max
+
+        Returns:
+            (order, final_scores, popularity_scores) where order holds the
+            indices of the top k candidates sorted by final score descending
+        """
+        relevance = np.clip(np.asarray(relevance_scores, dtype=np.float64), 0.0, 1.0)
+        seo = np.clip(np.asarray(seo_scores, dtype=np.float64) / 100.0, 0.0, 1.0)
+        clicks = np.asarray(click_counts, dtype=np.float64)
+
+        if max_click_count is None:
+            max_click_count = clicks.max() if clicks.size else 0.0
+        if max_click_count > 0:
+            popularity = np.clip(clicks / max_click_count, 0.0, 1.0)
+        else:
+            popularity = np.zeros_like(clicks)
+
+        final_scores = np.clip(
+            TFIDF_WEIGHT * relevance
+            + SEO_WEIGHT * seo
+            + POPULARITY_WEIGHT * popularity,
+            0.0,
+            1.0,
+        )
+
+        count = final_scores.size
+        k = count if top_k is None else max(0, min(top_k, count))
+        if 0 < k < count:
+            # Select the top k in linear time, then sort only those
+            candidates = np.argpartition(-final_scores, k - 1)[:k]
+        else:
+            candidates = np.arange(k)
+        order = candidates[np.argsort(-final_scores[candidates], kind="stable")]
+
+        return order, final_scores, popularity
+
 
 def get_ranking_engine() -> RankingEngine:
     """Factory function to get ranking engine"""
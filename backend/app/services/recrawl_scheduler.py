@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import math
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.config import (
+    RECRAWL_INTERVAL,
+    RECRAWL_MAX_AGE,
+    RECRAWL_BATCH_SIZE,
+    RECRAWL_SCAN_LIMIT,
+    RECRAWL_BATCH_TIMEOUT,
+    RECRAWL_LEASE,
+)
+from app.db import queries
+from app.services.crawler import get_crawler
+from app.services.inverted_index import get_inverted_index
+from app.services.duplicate_index import get_duplicate_index
+from app.services.ingest import build_recrawl_update
+
+logger = logging.getLogger(__name__)
+
+# Ages beyond this no longer raise a document's priority
+MAX_PRIORITY_AGE_HOURS = 24 * 30
+
+
+class RecrawlScheduler:
+    """Background re-crawl of stale URL documents, most valuable first"""
+
+    def __init__(self):
+        self.crawler = get_crawler()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def priority(doc: Dict[str, Any], now: datetime) -> float:
+        """
+        Score how urgently a document needs refreshing
+
+        Documents checked longest ago come first, boosted by how often they
+        are clicked and how often they appear in query results.
+        """
+        last_checked = doc.get("last_checked") or doc.get("last_updated")
+        if last_checked:
+            age_hours = (now - last_checked).total_seconds() / 3600
+        else:
+            age_hours = MAX_PRIORITY_AGE_HOURS
+        age_hours = min(max(age_hours, 0.0), MAX_PRIORITY_AGE_HOURS)
+
+        return (
+            age_hours
+            * (1 + math.log1p(doc.get("click_count") or 0))
+            * (1 + math.log1p(doc.get("query_hits") or 0))
+        )
+
+    async def recrawl(self, doc: Dict[str, Any]) -> str:
+        """
+        Revalidate one document with a conditional GET
+
+        Returns:
+            "not_modified", "updated" or "failed"
+        """
+        url = doc["url"]
+        status, page = await self.crawler.crawl_url_conditional(
+            url, doc.get("etag"), doc.get("last_modified")
+        )
+
+        if status == 304:
+            # Unchanged: skip parsing and re-scoring
+            await queries.touch_url(doc["_id"])
+            return "not_modified"
+
+        if not page:
+            # Back off until the next max-age window instead of retrying hot
+            await queries.touch_url(doc["_id"])
+            return "failed"
+
+        fields = build_recrawl_update(url, page)
+        if not await queries.update_url_metadata(str(doc["_id"]), fields):
+            return "failed"
+
+        get_duplicate_index().apply_document({"url": url, **fields})
+        get_inverted_index().add_document(
+            {
+                "_id": doc["_id"],
+                "url": url,
+                "click_count": doc.get("click_count", 0),
+                **fields,
+            }
+        )
+        return "updated"
+
+    async def run_once(self) -> Dict[str, int]:
+        """Re-crawl the highest priority batch of stale documents"""
+        # Only one process per deployment runs a given cycle
+        if not await queries.try_acquire_lease(
+            "recrawl_scheduler", self.owner, RECRAWL_LEASE
+        ):
+            return {}
+
+        now = datetime.utcnow()
+        stale = await queries.get_stale_urls(
+            now - timedelta(seconds=RECRAWL_MAX_AGE), RECRAWL_SCAN_LIMIT
+        )
+        batch = sorted(stale, key=lambda doc: self.priority(doc, now), reverse=True)[
+            :RECRAWL_BATCH_SIZE
+        ]
+
+        # Bounded so the cycle always ends while the lease is still held
+        try:
+            outcomes = await asyncio.wait_for(
+                asyncio.gather(*(self.recrawl(doc) for doc in batch)),
+                RECRAWL_BATCH_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Re-crawl batch of {len(batch)} URLs timed out")
+            return {}
+        counts = {
+            outcome: outcomes.count(outcome)
+            for outcome in ("updated", "not_modified", "failed")
+        }
+        if batch:
+            logger.info(f"🔄 Re-crawled {len(batch)} stale URLs: {counts}")
+        return counts
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Re-crawl cycle failed: {e}")
+            await asyncio.sleep(RECRAWL_INTERVAL)
+
+    def start(self):
+        """Start the background re-crawl loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background re-crawl loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.crawler.close()
+
+
+_recrawl_scheduler: Optional[RecrawlScheduler] = None
+
+
+def get_recrawl_scheduler() -> RecrawlScheduler:
+    """Get the process-wide re-crawl scheduler"""
+    global _recrawl_scheduler
+    if _recrawl_scheduler is None:
+        _recrawl_scheduler = RecrawlScheduler()
+    return _recrawl_scheduler
@@ -0,0 +1,106 @@
+import logging
+from typing import Any, Dict, List, Optional, Set
+from app.config import (
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_MAX_BYTES,
+)
+from app.utils.cache import TTLCache
+from app.utils.text_cleaner import normalize_query
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Text fields of a URL document kept with each cached candidate
+CACHED_TEXT_FIELDS = ("url", "title", "meta_description")
+
+# Rough per-candidate overhead of the dict and its float/str objects
+CANDIDATE_OVERHEAD_BYTES = 400
+
+
+def _estimate_size(candidates: List[Dict[str, Any]]) -> int:
+    """Estimate the memory held by a cached candidate set"""
+    return sum(
+        CANDIDATE_OVERHEAD_BYTES
+        + len(candidate["url"])
+        + len(candidate["title"])
+        + len(candidate["meta_description"])
+        for candidate in candidates
+    )
+
+
+class ResultCache:
+    """
+    Per-query cache of ranked candidates
+
+    Relevance and SEO scores do not change between calls for the same query,
+    so a hit only needs current click counts to be re-ranked.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_CACHE_TTL,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+    ):
+        self._cache = TTLCache(
+            max_entries,
+            ttl,
+            max_bytes=max_bytes,
+            sizeof=_estimate_size,
+            on_evict=self._forget,
+        )
+        self._queries_by_url: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _forget(self, key: str, candidates: List[Dict[str, Any]]):
+        """Drop reverse index entries of an evicted query"""
+        for candidate in candidates:
+            keys = self._queries_by_url.get(candidate["url_id"])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._queries_by_url[candidate["url_id"]]
+
+    def get(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Get the cached candidates of a query"""
+        candidates = self._cache.get(normalize_query(query))
+        record_cache("result", candidates is not None)
+        return candidates
+
+    def put(self, query: str, items: List[Dict[str, Any]], relevance_scores):
+        """Cache the candidate URL documents of a query with their relevance"""
+        key = normalize_query(query)
+        candidates = []
+        for item, relevance in zip(items, relevance_scores):
+            candidate = {field: item.get(field) or "" for field in CACHED_TEXT_FIELDS}
+            candidate["url_id"] = str(item.get("_id", ""))
+            candidate["meta_score"] = item.get("meta_score") or 0.0
+            candidate["relevance_score"] = float(relevance)
+            candidates.append(candidate)
+
+        self._cache.set(key, candidates)
+        for candidate in candidates:
+            self._queries_by_url.setdefault(candidate["url_id"], set()).add(key)
+
+    def invalidate_url(self, url_id: str) -> int:
+        """Drop every cached query whose candidates include a URL"""
+        keys = list(self._queries_by_url.get(str(url_id), ()))
+        for key in keys:
+            self._cache.invalidate(key)
+        if keys:
+            logger.info(f"🧹 Invalidated {len(keys)} cached queries for URL {url_id}")
+        return len(keys)
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide ranked result cache"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
@@ -1,11 +1,26 @@
+import asyncio
 import logging
 import requests
 from typing import List, Dict, Optional
-from app.config import SERPAPI_KEY, MAX_RESULTS_PER_QUERY, REQUEST_TIMEOUT
-from urllib.parse import urljoin, urlparse
+from app.config import (
+    SERPAPI_KEY,
+    MAX_RESULTS_PER_QUERY,
+    REQUEST_TIMEOUT,
+    SERP_CACHE_TTL,
+    SERP_CACHE_SIZE,
+    SERP_CACHE_PERSIST,
+)
+from app.db import queries
+from app.utils.cache import TTLCache, SingleFlight
+from app.utils.text_cleaner import normalize_query
+from app.utils.metrics import record_cache
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse
 
 logger = logging.getLogger(__name__)
 
+# Query parameters that identify a referral rather than a page
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "ref_src"}
+
 
 class SerpAPIService:
     """Service to fetch URLs from SerpAPI"""
@@ -13,6 +28,48 @@ class SerpAPIService:
     def __init__(self):
         self.api_key = SERPAPI_KEY
         self.base_url = "https://serpapi.com/search"
+        self.cache = TTLCache(SERP_CACHE_SIZE, SERP_CACHE_TTL)
+        self._single_flight = SingleFlight()
+
+    async def fetch_urls_cached(self, query: str) -> List[Dict[str, str]]:
+        """
+        Fetch top URLs for a query through the result cache
+
+        Lookups go to the in-memory LRU first, then the Mongo tier, and only
+        then upstream. Concurrent misses for the same query share one call.
+        Callers get their own copies, as they annotate the results.
+        """
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        record_cache("serp_memory", cached is not None)
+        if cached is None:
+            cached = await self._single_flight.do(
+                key, lambda: self._fetch_and_store(key, query)
+            )
+        else:
+            logger.info(f"📚 SerpAPI cache hit for query: {key}")
+
+        return [dict(result) for result in cached]
+
+    async def _fetch_and_store(self, key: str, query: str) -> List[Dict[str, str]]:
+        """Resolve a cache miss from the persistent tier or SerpAPI"""
+        if SERP_CACHE_PERSIST:
+            stored = await queries.get_serp_cache(key)
+            record_cache("serp_mongo", stored is not None)
+            if stored is not None:
+                self.cache.set(key, stored)
+                return stored
+
+        # The key only normalizes case and spacing; upstream gets the query
+        urls = await asyncio.to_thread(self.fetch_urls, query)
+
+        # Only cache successful lookups so failures are retried
+        if urls:
+            self.cache.set(key, urls)
+            if SERP_CACHE_PERSIST:
+                await queries.set_serp_cache(key, urls, SERP_CACHE_TTL)
+
+        return urls
 
     def fetch_urls(self, query: str) -> List[Dict[str, str]]:
         """Fetch top URLs from SerpAPI for a query"""
@@ -58,14 +115,30 @@ class SerpAPIService:
             return []
 
     def normalize_url(self, url: str) -> str:
-        """Normalize URL (remove fragments, trailing slashes, etc.)"""
+        """
+        Normalize URL so variants of the same page compare equal
+
+        Drops the fragment, tracking parameters, "www." and default ports,
+        lowercases the host and maps http to https.
+        """
         try:
             parsed = urlparse(url)
-            # Reconstruct without fragment
-            normalized = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            if parsed.query:
-                normalized += f"?{parsed.query}"
-            return normalized.rstrip("/")
+            host = (parsed.hostname or "").lower()
+            if host.startswith("www."):
+                host = host[4:]
+            if parsed.port and parsed.port not in (80, 443):
+                host += f":{parsed.port}"
+
+            params = [
+                (key, value)
+                for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                if not key.lower().startswith("utm_")
+                and key.lower() not in TRACKING_PARAMS
+            ]
+            normalized = f"https://{host}{parsed.path}".rstrip("/")
+            if params:
+                normalized += f"?{urlencode(sorted(params))}"
+            return normalized
         except:
             return url
 
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.config import (
+    SUGGEST_REFRESH_INTERVAL,
+    SUGGEST_REBUILD_INTERVAL,
+    SUGGEST_REFRESH_LAG,
+    SUGGEST_TOP_K,
+    SUGGEST_MAX_PREFIX,
+)
+from app.db import queries
+from app.utils.text_cleaner import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Most searched queries under this prefix, most searched first
+        self.top: List[str] = []
+
+
+def _normalize_prefix(text: str) -> str:
+    """Normalize like stored queries, keeping a trailing space as typed"""
+    prefix = normalize_query(text)
+    if prefix and text[-1:].isspace():
+        prefix += " "
+    return prefix
+
+
+class SuggestIndex:
+    """
+    Prefix trie over past search queries for autocomplete
+
+    Every node keeps the top-k queries under its prefix, so a lookup walks
+    at most SUGGEST_MAX_PREFIX nodes and copies one short list; Mongo is
+    never read on the keystroke path. Counts of searches that returned
+    results are added incrementally from search_history, and a periodic
+    full rebuild drops queries whose history has expired.
+    """
+
+    def __init__(self, top_k: int = SUGGEST_TOP_K):
+        self.top_k = top_k
+        self._root = _Node()
+        self._counts: Dict[str, int] = {}
+        self.watermark = datetime.min
+        self._rebuilt_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _promote(self, node: _Node, query: str, counts: Dict[str, int]):
+        top = node.top
+        if query not in top:
+            if len(top) >= self.top_k and counts[top[-1]] >= counts[query]:
+                return
+            top.append(query)
+        top.sort(key=lambda q: (-counts[q], q))
+        del top[self.top_k :]
+
+    def _insert(self, root: _Node, query: str, counts: Dict[str, int]):
+        node = root
+        self._promote(node, query, counts)
+        for char in query[:SUGGEST_MAX_PREFIX]:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+            self._promote(node, query, counts)
+
+    def add_counts(self, searches: Dict[str, int]):
+        """Add search counts per query text; counts only grow between rebuilds"""
+        for text, count in searches.items():
+            query = normalize_query(text)
+            if not query:
+                continue
+            self._counts[query] = self._counts.get(query, 0) + count
+            self._insert(self._root, query, self._counts)
+
+    def _build(self, searches: Dict[str, int]):
+        counts: Dict[str, int] = {}
+        for text, count in searches.items():
+            query = normalize_query(text)
+            if query:
+                counts[query] = counts.get(query, 0) + count
+
+        # Inserting most searched first fills each node's top-k in order
+        root = _Node()
+        for query in sorted(counts, key=lambda q: (-counts[q], q)):
+            self._insert(root, query, counts)
+        return root, counts
+
+    def suggest(self, text: str, limit: int = SUGGEST_TOP_K) -> List[str]:
+        """Most searched past queries starting with text"""
+        prefix = _normalize_prefix(text)
+        if not prefix:
+            return []
+
+        node = self._root
+        for char in prefix[:SUGGEST_MAX_PREFIX]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        if len(prefix) <= SUGGEST_MAX_PREFIX:
+            return node.top[:limit]
+        # Deeper prefixes are not indexed; filter the deepest node's top-k
+        return [query for query in node.top if query.startswith(prefix)][:limit]
+
+    async def refresh(self) -> int:
+        """Add searches logged since the watermark"""
+        end = datetime.utcnow() - timedelta(seconds=SUGGEST_REFRESH_LAG)
+        if end <= self.watermark:
+            return 0
+
+        searches = await queries.aggregate_search_counts(self.watermark, end)
+        if searches is None:
+            return 0
+
+        self.add_counts(searches)
+        self.watermark = end
+        return len(searches)
+
+    async def rebuild(self) -> bool:
+        """Rebuild from all retained search history and swap the trie in"""
+        end = datetime.utcnow() - timedelta(seconds=SUGGEST_REFRESH_LAG)
+        searches = await queries.aggregate_search_counts(datetime.min, end)
+        if searches is None:
+            return False
+
+        # Built off the event loop; lookups keep using the old trie meanwhile
+        self._root, self._counts = await asyncio.to_thread(self._build, searches)
+        self.watermark = end
+        self._rebuilt_at = time.monotonic()
+        logger.info(f"✅ Built suggestion index over {len(self._counts)} queries")
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                if (
+                    self._rebuilt_at is None
+                    or time.monotonic() - self._rebuilt_at >= SUGGEST_REBUILD_INTERVAL
+                ):
+                    await self.rebuild()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Suggestion index refresh failed: {e}")
+            await asyncio.sleep(SUGGEST_REFRESH_INTERVAL)
+
+    def start(self):
+        """Build the index and keep it refreshed in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop background refreshing"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_suggest_index: Optional[SuggestIndex] = None
+
+
+def get_suggest_index() -> SuggestIndex:
+    """Get the process-wide suggestion index"""
+    global _suggest_index
+    if _suggest_index is None:
+        _suggest_index = SuggestIndex()
+    return _suggest_index
@@ -1,10 +1,14 @@
 import logging
+import os
+import pickle
+from functools import lru_cache
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from app.utils.tokenizer import tokenize
 from app.utils.text_cleaner import clean_text, remove_stopwords
+from app.utils.sparse_store import SparseMatrixStore
 
 logger = logging.getLogger(__name__)
 
@@ -12,9 +16,9 @@ logger = logging.getLogger(__name__)
 class TFIDFEngine:
     """TF-IDF vectorization and ranking engine"""
 
-    def __init__(self):
+    def __init__(self, max_features: int = 500, version: int = 0):
         self.vectorizer = TfidfVectorizer(
-            max_features=500,
+            max_features=max_features,
             min_df=1,
             max_df=0.8,
             ngram_range=(1, 2),
@@ -24,6 +28,7 @@ class TFIDFEngine:
         self.fitted = False
         self.vectors = None
         self.texts = None
+        self.version = version
 
     def fit(self, documents: List[str]) -> bool:
         """
@@ -79,8 +84,11 @@ class TFIDFEngine:
             # Vectorize query
             query_vector = self.vectorizer.transform([query])
 
-            # Vectorize documents
-            doc_vectors = self.vectorizer.transform(documents)
+            # Reuse the vectors from fit() when ranking the fitted documents
+            if self.vectors is not None and documents == self.texts:
+                doc_vectors = self.vectors
+            else:
+                doc_vectors = self.vectorizer.transform(documents)
 
             # Calculate cosine similarity
             similarities = cosine_similarity(query_vector, doc_vectors)[0]
@@ -115,6 +123,138 @@ class TFIDFEngine:
             logger.error(f"❌ Error getting document vector: {e}")
             return None
 
+    def get_sparse_vector(self, document: str) -> Tuple[List[int], List[float]]:
+        """Get the non-zero (indices, values) of a document's TF-IDF vector"""
+        row = self.vectorizer.transform([document])
+        return row.indices.tolist(), row.data.tolist()
+
+    def score_sparse_vectors(
+        self, query: str, vectors: List[Tuple[List[int], List[float]]]
+    ) -> List[float]:
+        """
+        Score stored sparse document vectors against a query
+
+        Vectors are (indices, values) lists or arrays and L2-normalized, so
+        the dot product is the cosine similarity.
+        """
+        query_vector = self.vectorizer.transform([query]).toarray()[0]
+        return [
+            float(np.dot(query_vector[indices], values)) if len(indices) else 0.0
+            for indices, values in vectors
+        ]
+
+    def save(self, path: str) -> bool:
+        """Persist the fitted vectorizer"""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    {"version": self.version, "vectorizer": self.vectorizer},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error saving TF-IDF model: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TFIDFEngine"]:
+        """Load a persisted vectorizer"""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            engine = cls(version=state["version"])
+            engine.vectorizer = state["vectorizer"]
+            engine.fitted = True
+            return engine
+        except Exception as e:
+            logger.error(f"❌ Error loading TF-IDF model: {e}")
+            return None
+
+
+def fit_engine(
+    documents: List[str],
+    max_features: int,
+    version: int,
+    matrix_path: str,
+    doc_ids: List[str],
+) -> Optional[TFIDFEngine]:
+    """
+    Fit a new engine on documents and write their vectors to a matrix store
+    at matrix_path (process pool entry point)
+
+    Returns:
+        The fitted engine without document vectors, or None on failure
+    """
+    engine = TFIDFEngine(max_features=max_features, version=version)
+    if not engine.fit(documents):
+        return None
+
+    # The matrix is written here so it never travels back to the caller
+    if not SparseMatrixStore.save(
+        matrix_path,
+        engine.vectors,
+        doc_ids,
+        engine.vectorizer.get_feature_names_out(),
+    ):
+        return None
+
+    # Only the vectorizer needs to travel back. stop_words_ holds every term
+    # pruned by max_df/max_features, often far more than the vocabulary, and
+    # is only kept for introspection
+    engine.vectors = None
+    engine.texts = None
+    engine.vectorizer.stop_words_ = None
+    return engine
+
+
+@lru_cache(maxsize=2)
+def _load_published(model_path: str) -> Optional[TFIDFEngine]:
+    # Published versions never change, so each process loads one once
+    return TFIDFEngine.load(model_path)
+
+
+def transform_documents(
+    model_path: str, documents: List[str]
+) -> Optional[List[Tuple[List[int], List[float]]]]:
+    """
+    Vectorize documents with a published engine (process pool entry point)
+
+    Returns:
+        (indices, values) of each document's vector, or None if the engine
+        could not be loaded
+    """
+    engine = _load_published(model_path)
+    if engine is None:
+        return None
+    rows = engine.vectorizer.transform(documents)
+    return [
+        (rows.indices[start:end].tolist(), rows.data[start:end].tolist())
+        for start, end in zip(rows.indptr[:-1], rows.indptr[1:])
+    ]
+
+
+def score_documents(query: str, documents: List[str]) -> List[float]:
+    """
+    Fit a throwaway engine on documents and score them against a query
+    (process pool entry point)
+
+    Returns:
+        Relevance scores in document order
+    """
+    engine = TFIDFEngine()
+    if not engine.fit(documents):
+        return [0.0] * len(documents)
+
+    doc_ids = [str(i) for i in range(len(documents))]
+    scores = [0.0] * len(documents)
+    for doc_id, score in engine.rank_documents(query, documents, doc_ids):
+        scores[int(doc_id)] = float(score)
+    return scores
+
 
 def get_tfidf_engine() -> TFIDFEngine:
     """Factory function to get TF-IDF engine"""
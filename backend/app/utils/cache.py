@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after a TTL
+
+    With max_bytes and sizeof set, the total estimated size of the entries is
+    bounded too. on_evict(key, value) is called whenever an entry is dropped.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.total_bytes = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: Hashable, entry: tuple):
+        _, value, size = entry
+        self.total_bytes -= size
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live entry and mark it as recently used"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key, self._data.pop(key))
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store an entry, evicting the least recently used ones if full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.sizeof else 0
+
+        if key in self._data:
+            self._remove(key, self._data.pop(key))
+        self._data[key] = (expires_at, value, size)
+        self.total_bytes += size
+
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None
+            and self.total_bytes > self.max_bytes
+            and len(self._data) > 1
+        ):
+            self._remove(*self._data.popitem(last=False))
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop an entry"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._remove(key, entry)
+        return True
+
+    def clear(self):
+        for key in list(self._data):
+            self.invalidate(key)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single call"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn for key, or wait on the call already in flight for it"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
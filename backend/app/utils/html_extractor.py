@@ -0,0 +1,116 @@
+import re
+import logging
+from typing import Dict
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text is not visible page content
+SKIPPED_TAGS = {"script", "style", "head", "title"}
+
+# Characters dropped by clean_text
+SPECIAL_CHARS = re.compile(r"[^\w\s\-\.]")
+
+# Size of the slices fed to the streaming parser
+FEED_CHUNK_SIZE = 64 * 1024
+
+
+class _PageTarget:
+    """lxml parser target that collects page metadata and visible text"""
+
+    def __init__(self, max_text_chars: int):
+        self.max_text_chars = max_text_chars
+        self.title_parts = []
+        self.title_done = False
+        self.in_title = False
+        self.og_title = None
+        self.meta_description = None
+        self.meta_keywords = None
+        self.text_parts = []
+        self.text_length = 0
+        self.skip_depth = 0
+        self.done = False
+
+    def start(self, tag, attrib):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+        if tag == "title" and not self.title_done:
+            self.in_title = True
+        elif tag == "meta":
+            content = attrib.get("content")
+            if content is None:
+                return
+            name = (attrib.get("name") or "").lower()
+            if name == "description" and self.meta_description is None:
+                self.meta_description = content
+            elif name == "keywords" and self.meta_keywords is None:
+                self.meta_keywords = content
+            elif attrib.get("property") == "og:title" and self.og_title is None:
+                self.og_title = content
+
+    def end(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+        if tag == "title" and self.in_title:
+            self.in_title = False
+            self.title_done = True
+
+    def data(self, data):
+        if self.in_title:
+            self.title_parts.append(data)
+            return
+
+        if self.skip_depth or self.done:
+            return
+
+        # Normalize as clean_text does, one text node at a time
+        chunk = " ".join(SPECIAL_CHARS.sub("", data).split())
+        if chunk:
+            self.text_parts.append(chunk.lower())
+            self.text_length += len(chunk) + 1
+            if self.text_length >= self.max_text_chars:
+                self.done = True
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self
+
+
+def extract_page(html_content: str, max_text_chars: int = 5000) -> Dict[str, str]:
+    """
+    Extract title, meta tags and visible text from HTML in a single pass
+
+    Visible text is normalized like clean_text. Parsing stops once
+    max_text_chars of visible text have been collected.
+    """
+    target = _PageTarget(max_text_chars)
+    if not html_content:
+        return {
+            "title": "",
+            "meta_description": "",
+            "meta_keywords": "",
+            "visible_text": "",
+        }
+
+    parser = etree.HTMLParser(target=target, recover=True)
+
+    try:
+        for start in range(0, len(html_content), FEED_CHUNK_SIZE):
+            parser.feed(html_content[start : start + FEED_CHUNK_SIZE])
+            if target.done:
+                break
+        parser.close()
+    except etree.LxmlError as e:
+        logger.warning(f"⚠️ HTML parse stopped early: {e}")
+
+    title = "".join(target.title_parts).strip()
+    return {
+        "title": target.og_title if target.og_title is not None else title,
+        "meta_description": target.meta_description or "",
+        "meta_keywords": target.meta_keywords or "",
+        "visible_text": " ".join(target.text_parts)[:max_text_chars],
+    }
@@ -0,0 +1,238 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlparse
+from pymongo import monitoring
+from app.utils.profiler import active_profile
+
+# Latency buckets in seconds, from a fast cache hit to a slow crawl
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Distinct crawl hosts given their own label; the rest are reported as "other"
+MAX_HOST_LABELS = 200
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Base for metrics rendered in the Prometheus text exposition format"""
+
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        # Updated from Motor's driver threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = (
+            f"# HELP {self.name} {self.description}\n# TYPE {self.name} {self.kind}\n"
+        )
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(Metric):
+    """Cumulative bucket counts, sum and count of observations per label set"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a block, including time spent awaiting"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._series.items()
+            }
+
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics)
+
+
+registry = Registry()
+
+SEARCH_STAGE_SECONDS = registry.register(
+    Histogram(
+        "search_stage_seconds",
+        "Latency of each /search pipeline stage",
+        ("stage",),
+    )
+)
+CACHE_REQUESTS = registry.register(
+    Counter(
+        "cache_requests_total",
+        "Cache lookups by cache and outcome",
+        ("cache", "result"),
+    )
+)
+CRAWL_SECONDS = registry.register(
+    Histogram("crawl_seconds", "Page fetch latency per host", ("host",))
+)
+CRAWL_FAILURES = registry.register(
+    Counter("crawl_failures_total", "Failed page fetches per host", ("host", "reason"))
+)
+MONGO_COMMAND_SECONDS = registry.register(
+    Histogram(
+        "mongo_command_seconds",
+        "MongoDB command latency",
+        ("command",),
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    )
+)
+MONGO_COMMAND_FAILURES = registry.register(
+    Counter("mongo_command_failures_total", "Failed MongoDB commands", ("command",))
+)
+
+
+def stage_timer(stage: str):
+    """Time a /search pipeline stage"""
+    profile = active_profile.get()
+    if profile is None:
+        return SEARCH_STAGE_SECONDS.time(stage=stage)
+    return _profiled_stage_timer(stage, profile)
+
+
+@contextmanager
+def _profiled_stage_timer(stage: str, profile):
+    """Time a stage into both the metrics and the request's profile"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SEARCH_STAGE_SECONDS.observe(elapsed, stage=stage)
+        profile.add_stage(stage, elapsed)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+_host_labels = set()
+_host_labels_lock = threading.Lock()
+
+
+def host_label(url: str) -> str:
+    """Host of a URL as a metric label, bounded to MAX_HOST_LABELS distinct hosts"""
+    host = urlparse(url).hostname or "unknown"
+    with _host_labels_lock:
+        if host in _host_labels:
+            return host
+        if len(_host_labels) < MAX_HOST_LABELS:
+            _host_labels.add(host)
+            return host
+    return "other"
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding the Mongo latency metrics"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1e6, command=event.command_name
+        )
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1e6, command=event.command_name
+        )
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return registry.render()
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Optional
+import numpy as np
+from app.config import (
+    DUPLICATE_MINHASH_PERMUTATIONS,
+    DUPLICATE_MIN_SHINGLES,
+    DUPLICATE_SHINGLE_SIZE,
+)
+
+# Universal hash functions (a * x + b) mod p standing in for permutations.
+# The seed is fixed so signatures agree across processes and restarts.
+_PRIME = (1 << 31) - 1
+_params = np.random.RandomState(20240601).randint(
+    1, _PRIME, size=(2, DUPLICATE_MINHASH_PERMUTATIONS)
+)
+_A = _params[0].astype(np.uint64)
+_B = _params[1].astype(np.uint64)
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a text's word shingles
+
+    The fraction of positions at which two signatures agree estimates the
+    Jaccard similarity of the texts' shingle sets.
+
+    Returns:
+        uint32 array of DUPLICATE_MINHASH_PERMUTATIONS values, or None for
+        texts with fewer than DUPLICATE_MIN_SHINGLES distinct shingles, whose
+        signatures would match unrelated pages with the same boilerplate
+    """
+    words = text.split()
+    size = DUPLICATE_SHINGLE_SIZE
+    shingles = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+    if len(shingles) < DUPLICATE_MIN_SHINGLES:
+        return None
+
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode(), digest_size=4).digest()
+        for shingle in shingles
+    )
+    hashes = np.frombuffer(digests, dtype="<u4").astype(np.uint64)
+
+    # a < 2**31 and x < 2**32, so a * x + b fits in 64 bits
+    values = (np.outer(hashes, _A) + _B) % _PRIME
+    return values.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def to_bytes(signature: Optional[np.ndarray]) -> Optional[bytes]:
+    """Compact form stored on urls documents"""
+    return None if signature is None else signature.astype("<u4").tobytes()
+
+
+def from_bytes(data: Optional[bytes]) -> Optional[np.ndarray]:
+    return None if data is None else np.frombuffer(data, dtype="<u4")
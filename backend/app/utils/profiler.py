@@ -0,0 +1,146 @@
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config import ADMIN_TOKEN, PROFILE_SAMPLE_INTERVAL, PROFILE_BUFFER_SIZE
+
+# Profile of the request running in the current context, if it is profiled
+active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "active_profile", default=None
+)
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against ADMIN_TOKEN; admin features are off without one"""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Sample one thread's Python stack at a fixed interval
+
+    Samples are aggregated as collapsed stacks ("outer;inner count"), the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+class RequestProfile:
+    """Stack samples and stage timings of one profiled request"""
+
+    def __init__(self, description: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.description = description
+        self.started_at = datetime.utcnow()
+        self.duration = 0.0
+        self.stages: List[Dict[str, Any]] = []
+        self.stacks: Counter = Counter()
+
+    def add_stage(self, stage: str, seconds: float):
+        self.stages.append({"stage": stage, "seconds": seconds})
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "description": self.description,
+            "started_at": self.started_at.isoformat(),
+            "duration": self.duration,
+            "samples": sum(self.stacks.values()),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), "stages": self.stages, "stacks": dict(self.stacks)}
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles"""
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self._profiles: deque = deque(maxlen=size)
+
+    def add(self, profile: RequestProfile):
+        self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        for profile in self._profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Get the process-wide profile ring buffer"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore()
+    return _profile_store
+
+
+@contextmanager
+def profile_request(description: str):
+    """
+    Profile the enclosed request handling and store the result
+
+    The sampler sees everything running on the event loop thread, so
+    requests handled concurrently show up in the stacks too. Stage timings
+    only cover this request.
+    """
+    profile = RequestProfile(description)
+    token = active_profile.set(profile)
+    sampler = SamplingProfiler(threading.get_ident())
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.duration = time.perf_counter() - start
+        profile.stacks = sampler.stop()
+        active_profile.reset(token)
+        get_profile_store().add(profile)
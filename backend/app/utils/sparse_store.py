@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import shutil
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+
+logger = logging.getLogger(__name__)
+
+# ObjectId hex strings are 24 characters
+DOC_ID_DTYPE = "S24"
+
+
+class SparseMatrixStore:
+    """
+    Read-only CSR document-term matrix persisted as .npy arrays
+
+    A store directory holds:
+        data.npy, indices.npy, indptr.npy   CSR arrays of the matrix
+        doc_ids.npy                         document ID of each row
+        doc_order.npy                       rows sorted by document ID
+        vocab.txt                           one term per line, by column
+        meta.json                           shape and format version
+
+    Arrays are memory-mapped on load, so startup does not read the matrix and
+    every process mapping the same files shares them through the page cache.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(
+        self,
+        directory: str,
+        data: np.ndarray,
+        indices: np.ndarray,
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        doc_order: np.ndarray,
+        shape: Tuple[int, int],
+    ):
+        self.directory = directory
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.doc_order = doc_order
+        self.shape = shape
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @staticmethod
+    def save(
+        directory: str,
+        matrix,
+        doc_ids: Sequence[str],
+        vocabulary: Sequence[str],
+    ) -> bool:
+        """
+        Write a matrix to a new store directory atomically
+
+        Args:
+            directory: Store directory; must not exist yet
+            matrix: Sparse matrix with one row per document
+            doc_ids: Document ID of each row
+            vocabulary: Term of each column
+        """
+        tmp_dir = f"{directory}.tmp-{os.getpid()}"
+        try:
+            matrix = csr_matrix(matrix)
+            matrix.sort_indices()
+            index_dtype = np.int32 if matrix.nnz < 2**31 else np.int64
+
+            os.makedirs(tmp_dir, exist_ok=True)
+            np.save(os.path.join(tmp_dir, "data.npy"), matrix.data.astype(np.float32))
+            np.save(
+                os.path.join(tmp_dir, "indices.npy"),
+                matrix.indices.astype(index_dtype),
+            )
+            np.save(
+                os.path.join(tmp_dir, "indptr.npy"), matrix.indptr.astype(index_dtype)
+            )
+
+            ids = np.array([str(doc_id) for doc_id in doc_ids], dtype=DOC_ID_DTYPE)
+            np.save(os.path.join(tmp_dir, "doc_ids.npy"), ids)
+            np.save(
+                os.path.join(tmp_dir, "doc_order.npy"),
+                np.argsort(ids, kind="stable").astype(index_dtype),
+            )
+
+            with open(os.path.join(tmp_dir, "vocab.txt"), "w", encoding="utf-8") as f:
+                f.writelines(f"{term}\n" for term in vocabulary)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(
+                    {
+                        "format_version": SparseMatrixStore.FORMAT_VERSION,
+                        "shape": list(matrix.shape),
+                        "nnz": int(matrix.nnz),
+                    },
+                    f,
+                )
+
+            os.replace(tmp_dir, directory)
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Error saving sparse matrix: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> Optional["SparseMatrixStore"]:
+        """Open a store directory, memory-mapping its arrays by default"""
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+            if meta.get("format_version") != cls.FORMAT_VERSION:
+                logger.warning(f"⚠️ Unsupported sparse matrix format in {directory}")
+                return None
+
+            mmap_mode = "r" if mmap else None
+
+            def load_array(name: str) -> np.ndarray:
+                return np.load(os.path.join(directory, name), mmap_mode=mmap_mode)
+
+            return cls(
+                directory,
+                load_array("data.npy"),
+                load_array("indices.npy"),
+                load_array("indptr.npy"),
+                load_array("doc_ids.npy"),
+                load_array("doc_order.npy"),
+                tuple(meta["shape"]),
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Error loading sparse matrix from {directory}: {e}")
+            return None
+
+    def row_of(self, doc_id: str) -> Optional[int]:
+        """Row of a document, by binary search over the sorted IDs"""
+        key = str(doc_id).encode()
+        position = int(np.searchsorted(self.doc_ids, key, sorter=self.doc_order))
+        if position < len(self.doc_order):
+            row = int(self.doc_order[position])
+            if self.doc_ids[row] == key:
+                return row
+        return None
+
+    def row(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Non-zero (column indices, values) of a row, as views into the store"""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    @property
+    def matrix(self) -> csr_matrix:
+        """The whole matrix, backed by the stored arrays without copying"""
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Term of each column, read on first use"""
+        if self._vocabulary is None:
+            with open(os.path.join(self.directory, "vocab.txt"), encoding="utf-8") as f:
+                self._vocabulary = f.read().splitlines()
+        return self._vocabulary
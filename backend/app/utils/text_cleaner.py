@@ -1,9 +1,15 @@
 import re
 import string
 import logging
+from collections import Counter
+from app.utils.tokenizer import tokenize
+from app.utils.text_codec import decode_text
 
 logger = logging.getLogger(__name__)
 
+# Document fields the inverted index covers, in full
+INDEXED_FIELDS = ("title", "meta_description", "meta_keywords", "visible_text")
+
 
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
@@ -22,6 +28,11 @@ def clean_text(text: str) -> str:
     return text.lower()
 
 
+def normalize_query(query: str) -> str:
+    """Normalize query text into a cache key"""
+    return " ".join(query.lower().split())
+
+
 def extract_visible_text(html_content: str) -> str:
     """Extract readable text from HTML"""
     try:
@@ -47,6 +58,50 @@ def extract_visible_text(html_content: str) -> str:
         return ""
 
 
+def build_ranking_text(doc: dict) -> str:
+    """Build the normalized text a document is ranked on"""
+    combined_text = " ".join(
+        [
+            doc.get("title") or "",
+            doc.get("meta_description") or "",
+            doc.get("meta_keywords") or "",
+            (decode_text(doc.get("visible_text")) or "")[:2000],  # Limit text size
+        ]
+    )
+    return clean_text(combined_text)
+
+
+def build_index_terms(doc: dict) -> list:
+    """Terms the inverted index holds for a document, from its full fields"""
+    text = " ".join(decode_text(doc.get(field)) or "" for field in INDEXED_FIELDS)
+    return remove_stopwords(tokenize(text))
+
+
+def build_ranking_fields(doc: dict) -> dict:
+    """
+    Precompute the ranking text of a document and its term statistics
+
+    Stored on urls documents at ingest time so the query path does not
+    rebuild them. term_freqs covers the full indexed fields, not the
+    truncated ranking text, so BM25 statistics match documents the index
+    analyzes itself.
+    """
+    ranking_text = build_ranking_text(doc)
+    return {
+        "ranking_text": ranking_text,
+        "token_count": len(remove_stopwords(tokenize(ranking_text))),
+        "term_freqs": dict(Counter(build_index_terms(doc))),
+    }
+
+
+def get_ranking_text(doc: dict) -> str:
+    """Stored ranking text of a document, built on the fly for legacy ones"""
+    ranking_text = decode_text(doc.get("ranking_text"))
+    if ranking_text is None:
+        return build_ranking_text(doc)
+    return ranking_text
+
+
 def remove_stopwords(tokens: list) -> list:
     """Remove common English stopwords"""
     stopwords = {
@@ -0,0 +1,61 @@
+import logging
+import zlib
+from typing import Any, Dict, Optional, Union
+from app.config import TEXT_CODEC, TEXT_COMPRESS_MIN_CHARS, TEXT_ZLIB_LEVEL
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Large text fields of urls documents, stored compressed
+COMPRESSED_TEXT_FIELDS = ("visible_text", "ranking_text")
+
+# First byte of a stored value names its codec; plain strings predate them
+ZLIB_MARKER = b"\x01"
+ZSTD_MARKER = b"\x02"
+
+if TEXT_CODEC == "zstd" and zstandard is None:
+    logger.warning("⚠️ TEXT_CODEC=zstd but zstandard is not installed; using zlib")
+
+
+def encode_text(text: str) -> Union[str, bytes]:
+    """Compress text for storage; short texts are kept as plain strings"""
+    if len(text) < TEXT_COMPRESS_MIN_CHARS:
+        return text
+
+    data = text.encode("utf-8")
+    if TEXT_CODEC == "zstd" and zstandard is not None:
+        return ZSTD_MARKER + zstandard.ZstdCompressor().compress(data)
+    return ZLIB_MARKER + zlib.compress(data, TEXT_ZLIB_LEVEL)
+
+
+def decode_text(value: Any) -> Optional[str]:
+    """Text of a stored value, compressed or plain; None stays None"""
+    if value is None or isinstance(value, str):
+        return value
+
+    try:
+        value = bytes(value)
+        marker, data = value[:1], value[1:]
+        if marker == ZLIB_MARKER:
+            return zlib.decompress(data).decode("utf-8")
+        if marker == ZSTD_MARKER:
+            if zstandard is None:
+                raise ValueError("zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+        raise ValueError(f"unknown codec marker {marker!r}")
+    except Exception as e:
+        logger.error(f"❌ Error decoding stored text: {e}")
+        return ""
+
+
+def encode_text_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a document with its large text fields compressed"""
+    encoded = dict(doc)
+    for field in COMPRESSED_TEXT_FIELDS:
+        if isinstance(encoded.get(field), str):
+            encoded[field] = encode_text(encoded[field])
+    return encoded
@@ -0,0 +1,122 @@
+"""
+Crawl worker
+
+Leases jobs from the crawl_jobs queue, crawls each page and fills in the
+placeholder urls document that /search stored for it. Run as many workers as
+needed, independently of the API:
+
+    python -m app.workers.crawl_worker --worker-id crawler-1
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict
+from app.config import (
+    CRAWL_WORKER_BATCH,
+    CRAWL_WORKER_POLL_INTERVAL,
+    TFIDF_REFIT_INTERVAL,
+)
+from app.db import queries
+from app.db.connection import connect_to_mongo, close_mongo
+from app.services.crawler import get_crawler
+from app.services.crawl_queue import get_crawl_queue
+from app.services.corpus_model import get_corpus_model
+from app.services.cpu_pool import get_cpu_pool
+from app.services.duplicate_index import get_duplicate_index, warm_duplicate_index
+from app.services.ingest import build_recrawl_update
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlWorker:
+    """Drain the crawl job queue"""
+
+    def __init__(self, worker_id: str, batch_size: int = CRAWL_WORKER_BATCH):
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.crawler = get_crawler()
+        self.queue = get_crawl_queue()
+        self.corpus_model = get_corpus_model()
+        self._model_checked_at = 0.0
+
+    async def process(self, job: Dict[str, Any]) -> bool:
+        """Crawl one job's URL and store the result on its document"""
+        url = job["_id"]
+        try:
+            page = await self.crawler.crawl_url_async(url)
+            if not page:
+                await self.queue.fail(job, "crawl failed")
+                return False
+
+            # Clears pending_crawl and refreshes last_updated, which is how API
+            # processes notice the document changed
+            fields = build_recrawl_update(url, page)
+            if not await queries.update_url_metadata(job["url_id"], fields):
+                await self.queue.fail(job, "update failed")
+                return False
+
+            get_duplicate_index().apply_document({"url": url, **fields})
+            await self.queue.complete(job)
+            return True
+        except Exception as e:
+            # One bad page must not abort the rest of the batch
+            logger.error(f"❌ Error processing crawl job {url}: {e}")
+            await self.queue.fail(job, str(e))
+            return False
+
+    def refresh_model(self):
+        """Pick up newly published corpus models for document vectors"""
+        if time.monotonic() - self._model_checked_at >= TFIDF_REFIT_INTERVAL:
+            self._model_checked_at = time.monotonic()
+            self.corpus_model.load_latest()
+
+    async def run(self):
+        """Lease and process jobs until cancelled"""
+        logger.info(f"🚀 Crawl worker {self.worker_id} started")
+        while True:
+            self.refresh_model()
+
+            jobs = await self.queue.lease(self.worker_id, self.batch_size)
+            if not jobs:
+                await asyncio.sleep(CRAWL_WORKER_POLL_INTERVAL)
+                continue
+
+            outcomes = await asyncio.gather(*(self.process(job) for job in jobs))
+            logger.info(
+                f"✅ Crawled {sum(outcomes)}/{len(jobs)} queued URLs "
+                f"({self.worker_id})"
+            )
+
+
+async def main(worker_id: str):
+    await connect_to_mongo()
+    # Pages stored by other processes after this point are not fingerprinted
+    # here until the worker restarts
+    await warm_duplicate_index()
+    worker = CrawlWorker(worker_id)
+    try:
+        await worker.run()
+    finally:
+        await worker.crawler.close()
+        get_cpu_pool().shutdown()
+        await close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a crawl queue worker")
+    parser.add_argument(
+        "--worker-id",
+        default=f"{socket.gethostname()}:{os.getpid()}",
+        help="Identifies this worker's job leases",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main(args.worker_id))
+    except KeyboardInterrupt:
+        pass
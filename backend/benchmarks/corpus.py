@@ -0,0 +1,104 @@
+"""Deterministic synthetic HTML pages and documents for the benchmarks"""
+
+import itertools
+import random
+from typing import Dict, List
+
+# Size of the synthetic vocabulary; word frequencies follow Zipf's law
+VOCABULARY_SIZE = 20000
+
+SYLLABLES = (
+    "ka",
+    "lo",
+    "mi",
+    "ne",
+    "ru",
+    "sa",
+    "ti",
+    "vo",
+    "ze",
+    "qua",
+    "bre",
+    "cor",
+    "dan",
+    "fel",
+    "gri",
+    "hol",
+    "jun",
+    "pex",
+    "tor",
+    "wil",
+)
+
+
+def build_vocabulary(rng: random.Random, size: int = VOCABULARY_SIZE) -> List[str]:
+    """Generate distinct pseudo-words"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class CorpusGenerator:
+    """Generate HTML pages and parsed documents from a fixed seed"""
+
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.vocabulary = build_vocabulary(self.rng)
+        self.cum_weights = list(
+            itertools.accumulate(
+                1 / rank for rank in range(1, len(self.vocabulary) + 1)
+            )
+        )
+
+    def words(self, count: int) -> str:
+        return " ".join(
+            self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=count)
+        )
+
+    def query(self, terms: int = 3) -> str:
+        return self.words(terms)
+
+    def url(self, i: int) -> str:
+        slug = "-".join(self.rng.choices(self.vocabulary[:2000], k=3))
+        return f"https://site{i % 500}.example.com/articles/{slug}"
+
+    def html_page(self, i: int) -> str:
+        """A page with head metadata, boilerplate and a few paragraphs of body"""
+        paragraphs = "".join(
+            f"<p>{self.words(self.rng.randint(20, 60))}</p>"
+            for _ in range(self.rng.randint(2, 5))
+        )
+        return (
+            "<!DOCTYPE html><html><head>"
+            f"<title>{self.words(self.rng.randint(4, 10))}</title>"
+            f'<meta name="description" content="{self.words(self.rng.randint(10, 25))}">'
+            f'<meta name="keywords" content="{", ".join(self.words(5).split())}">'
+            "<style>body { font-family: sans-serif; } .nav { display: flex; }</style>"
+            "<script>window.dataLayer = window.dataLayer || [];</script>"
+            "</head><body>"
+            '<nav class="nav"><a href="/">Home</a> <a href="/about">About</a></nav>'
+            f"<article><h1>{self.words(6)}</h1>{paragraphs}</article>"
+            "<footer>&copy; Example Media &amp; Co.</footer>"
+            "</body></html>"
+        )
+
+    def document(self, i: int) -> Dict[str, str]:
+        """A parsed urls document as the crawler would produce"""
+        return {
+            "url": self.url(i),
+            "title": self.words(self.rng.randint(4, 10)),
+            "meta_description": self.words(self.rng.randint(10, 25)),
+            "meta_keywords": self.words(5),
+            "visible_text": self.words(self.rng.randint(40, 160)),
+        }
+
+
+def generate_pages(count: int, seed: int = 42) -> List[str]:
+    generator = CorpusGenerator(seed)
+    return [generator.html_page(i) for i in range(count)]
+
+
+def generate_documents(count: int, seed: int = 42) -> List[Dict[str, str]]:
+    generator = CorpusGenerator(seed)
+    return [generator.document(i) for i in range(count)]
@@ -0,0 +1,297 @@
+"""
+Component micro-benchmarks
+
+Times the text, parsing, TF-IDF, SEO and ranking hot paths on synthetic
+corpora and compares each result with a stored baseline:
+
+    python -m benchmarks.run                   # 10, 1k and 10k documents
+    python -m benchmarks.run --sizes 10,100000
+    python -m benchmarks.run --only tfidf_fit,rank_results
+    python -m benchmarks.run --save-baseline   # record this machine's numbers
+
+Exits with status 1 when a benchmark is slower than its baseline by more
+than --threshold. Baselines are machine-specific, so record one on the
+machine you compare on.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from benchmarks.corpus import CorpusGenerator, generate_documents, generate_pages
+
+DEFAULT_SIZES = (10, 1000, 10000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Stop repeating a benchmark once this much time has been spent on it
+TIME_BUDGET = 2.0  # seconds
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # Builds the timed callable from the corpus; setup cost is not timed
+    setup: Callable[["Corpus", int], Callable[[], Any]]
+    # HTML benchmarks take pages, the rest take parsed documents
+    uses_pages: bool = False
+
+
+class Corpus:
+    """Synthetic pages and documents, generated once at the largest size"""
+
+    def __init__(self, size: int, needs_pages: bool):
+        self.documents = generate_documents(size)
+        self.pages = generate_pages(size) if needs_pages else []
+        generator = CorpusGenerator(seed=7)
+        self.queries = [generator.query() for _ in range(20)]
+
+
+def _bench_clean_text(corpus: Corpus, n: int):
+    from app.utils.text_cleaner import clean_text
+
+    texts = [doc["visible_text"] for doc in corpus.documents[:n]]
+    return lambda: [clean_text(text) for text in texts]
+
+
+def _bench_extract_visible_text(corpus: Corpus, n: int):
+    from app.utils.text_cleaner import extract_visible_text
+
+    pages = corpus.pages[:n]
+    return lambda: [extract_visible_text(page) for page in pages]
+
+
+def _bench_parse_html(corpus: Corpus, n: int):
+    from app.services.crawler import WebCrawler
+
+    crawler = WebCrawler()
+    pages = corpus.pages[:n]
+    return lambda: [crawler._parse_html(page, "https://example.com") for page in pages]
+
+
+def _ranking_texts(corpus: Corpus, n: int) -> List[str]:
+    from app.utils.text_cleaner import build_ranking_text
+
+    return [build_ranking_text(doc) for doc in corpus.documents[:n]]
+
+
+def _bench_tfidf_fit(corpus: Corpus, n: int):
+    from app.services.tfidf_engine import TFIDFEngine
+
+    texts = _ranking_texts(corpus, n)
+    return lambda: TFIDFEngine().fit(texts)
+
+
+def _bench_tfidf_rank(corpus: Corpus, n: int):
+    from app.services.tfidf_engine import TFIDFEngine
+
+    texts = _ranking_texts(corpus, n)
+    doc_ids = [str(i) for i in range(n)]
+    engine = TFIDFEngine()
+    engine.fit(texts)
+    return lambda: [
+        engine.rank_documents(query, texts, doc_ids) for query in corpus.queries
+    ]
+
+
+def _bench_seo_score(corpus: Corpus, n: int):
+    from app.services.seo_scoring import SEOScorer
+
+    docs = corpus.documents[:n]
+    return lambda: [
+        SEOScorer.calculate_score(
+            doc["title"],
+            doc["meta_description"],
+            doc["meta_keywords"],
+            doc["visible_text"],
+            doc["url"],
+        )
+        for doc in docs
+    ]
+
+
+def _scored_results(n: int) -> List[Dict[str, Any]]:
+    generator = CorpusGenerator(seed=11)
+    return [
+        {
+            "url_id": str(i),
+            "relevance_score": generator.rng.random(),
+            "meta_score": generator.rng.uniform(0, 100),
+            "click_count": generator.rng.randint(0, 500),
+        }
+        for i in range(n)
+    ]
+
+
+def _bench_rank_results(corpus: Corpus, n: int):
+    from app.services.ranking_engine import RankingEngine
+
+    results = _scored_results(n)
+    # rank_results annotates its input, so each run gets fresh dicts
+    return lambda: RankingEngine.rank_results([dict(r) for r in results], 500)
+
+
+def _bench_rank_batch(corpus: Corpus, n: int):
+    from app.services.ranking_engine import RankingEngine
+
+    results = _scored_results(n)
+    relevance = [r["relevance_score"] for r in results]
+    seo = [r["meta_score"] for r in results]
+    clicks = [r["click_count"] for r in results]
+    return lambda: RankingEngine.rank_batch(relevance, seo, clicks, top_k=10)
+
+
+BENCHMARKS = [
+    Benchmark("clean_text", _bench_clean_text),
+    Benchmark("extract_visible_text", _bench_extract_visible_text, uses_pages=True),
+    Benchmark("parse_html", _bench_parse_html, uses_pages=True),
+    Benchmark("tfidf_fit", _bench_tfidf_fit),
+    Benchmark("tfidf_rank", _bench_tfidf_rank),
+    Benchmark("seo_score", _bench_seo_score),
+    Benchmark("rank_results", _bench_rank_results),
+    Benchmark("rank_batch", _bench_rank_batch),
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Median wall time over up to repeat runs, then peak traced memory of one"""
+    timings = []
+    spent = 0.0
+    while len(timings) < repeat and (not timings or spent < TIME_BUDGET):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        spent += elapsed
+
+    # Tracing slows execution, so memory is measured on a separate run
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": statistics.median(timings),
+        "runs": len(timings),
+        "peak_kb": peak / 1024,
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+def run(
+    sizes: List[int],
+    only: Optional[List[str]],
+    repeat: int,
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    selected = [b for b in BENCHMARKS if not only or b.name in only]
+    corpus = Corpus(max(sizes), needs_pages=any(b.uses_pages for b in selected))
+
+    results = {}
+    regressions = []
+    print(
+        f"{'benchmark':<22}{'size':>8}{'time (ms)':>12}{'items/s':>12}"
+        f"{'peak KB':>12}{'vs baseline':>14}"
+    )
+    for bench in selected:
+        for size in sizes:
+            result = measure(bench.setup(corpus, size), repeat)
+            result["items_per_second"] = size / result["seconds"]
+            key = f"{bench.name}[{size}]"
+            results[key] = result
+
+            change = ""
+            previous = baseline.get(key)
+            if previous:
+                ratio = result["seconds"] / previous["seconds"] - 1
+                change = f"{ratio:+.1%}"
+                if ratio > threshold:
+                    change += " !"
+                    regressions.append(key)
+
+            print(
+                f"{bench.name:<22}{size:>8}{result['seconds'] * 1000:>12.2f}"
+                f"{result['items_per_second']:>12.0f}{result['peak_kb']:>12.0f}"
+                f"{change:>14}"
+            )
+
+    return results, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run component micro-benchmarks")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated corpus sizes (documents or pages)",
+    )
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=5, help="Max timed runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Record these results as the new baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Slowdown vs baseline reported as a regression (0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    # Services log per call, which would dominate the timings
+    logging.disable(logging.CRITICAL)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    only = args.only.split(",") if args.only else None
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+
+    results, regressions = run(sizes, only, args.repeat, baseline, args.threshold)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nSaved baseline to {args.baseline}")
+    elif regressions:
+        print(
+            f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: "
+            + ", ".join(regressions)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,456 @@
-def main():
-    print("Hello from backend!")
+"""
+Bulk ingestion of pages into the urls collection
+
+Seeds the corpus offline from URL lists, sitemaps and local HTML dumps:
+
+    python main.py urls.txt                       # one URL per line
+    python main.py sitemap.xml sitemap-2.xml.gz   # urlsets and sitemap indexes
+    python main.py dumps/ --base-url https://example.com
+    python main.py urls.txt --checkpoint seed.checkpoint
+
+URLs are crawled concurrently through WebCrawler, local files are parsed in
+the CPU pool, and every page is scored and fingerprinted like a page crawled
+by /search. Documents are written in unordered bulk upserts keyed on url.
+
+Progress is checkpointed after every write, as the number of source items
+handled in order. Running the same command again resumes after that point.
+Items written but not yet checkpointed are upserted again, which leaves them
+unchanged. A batch that cannot be written at all stops the run without
+advancing the checkpoint.
+"""
+
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import requests
+from lxml import etree
+from app.config import CRAWL_CONCURRENCY, REQUEST_TIMEOUT
+from app.db import queries
+from app.db.connection import connect_to_mongo, close_mongo
+from app.services.corpus_model import get_corpus_model
+from app.services.cpu_pool import get_cpu_pool
+from app.services.crawler import get_crawler, parse_page
+from app.services.duplicate_index import warm_duplicate_index
+from app.services.ingest import build_url_document
+
+logger = logging.getLogger("ingest")
+
+HTML_SUFFIXES = (".html", ".htm")
+
+# Source items are read off the event loop in chunks of this many
+READ_CHUNK = 1000
+
+# Bulk writes that fail outright are retried this many times before the run
+# stops; documents rejected individually are retried in as many later batches
+WRITE_ATTEMPTS = 3
+
+# (url, local file path or None to crawl the URL)
+Item = Tuple[str, Optional[str]]
+
+
+def _local_name(tag: Any) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+
+def _open_sitemap(location: str):
+    """Open a local or remote sitemap, gunzipping it when needed"""
+    if location.startswith(("http://", "https://")):
+        response = requests.get(location, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        stream = io.BytesIO(response.content)
+    else:
+        stream = open(location, "rb")
+
+    if stream.read(2) == b"\x1f\x8b":
+        stream.seek(0)
+        return gzip.GzipFile(fileobj=stream)
+    stream.seek(0)
+    return stream
+
+
+def iter_sitemap(location: str) -> Iterator[Item]:
+    """Page URLs of a sitemap, following sitemap indexes"""
+    nested = []
+    with _open_sitemap(location) as stream:
+        for _, element in etree.iterparse(stream, events=("end",), recover=True):
+            if _local_name(element.tag) == "loc" and element.text:
+                url = element.text.strip()
+                if _local_name(element.getparent().tag) == "sitemap":
+                    nested.append(url)
+                else:
+                    yield url, None
+            elif _local_name(element.tag) in ("url", "sitemap"):
+                # Drop parsed entries so large sitemaps stream in constant memory
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    for child in nested:
+        try:
+            yield from iter_sitemap(child)
+        except Exception as e:
+            logger.error(f"❌ Error reading sitemap {child}: {e}")
+
+
+def iter_url_list(path: str) -> Iterator[Item]:
+    """URLs of a text file, one per line; blank lines and # comments skipped"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url, None
+
+
+def iter_html_dump(directory: str, base_url: Optional[str]) -> Iterator[Item]:
+    """HTML files under a directory, in a stable order, with their URLs"""
+    root = Path(directory).resolve()
+    for path in sorted(root.rglob("*")):
+        if path.suffix.lower() not in HTML_SUFFIXES or not path.is_file():
+            continue
+        if base_url:
+            url = f"{base_url.rstrip('/')}/{path.relative_to(root).as_posix()}"
+        else:
+            url = path.as_uri()
+        yield url, str(path)
+
+
+def _is_sitemap(path: str) -> bool:
+    if path.endswith((".xml", ".xml.gz")):
+        return True
+    with open(path, "rb") as f:
+        head = f.read(512)
+    return (
+        head.startswith(b"\x1f\x8b") or b"<urlset" in head or b"<sitemapindex" in head
+    )
+
+
+def iter_sources(sources: List[str], base_url: Optional[str]) -> Iterator[Item]:
+    """Items of every source, in order"""
+    for source in sources:
+        if os.path.isdir(source):
+            yield from iter_html_dump(source, base_url)
+        elif _is_sitemap(source):
+            yield from iter_sitemap(source)
+        else:
+            yield from iter_url_list(source)
+
+
+class Checkpoint:
+    """Resume point of an ingestion run, saved atomically as JSON"""
+
+    def __init__(self, path: str, sources: List[str]):
+        self.path = path
+        self.sources = sources
+        self.offset = 0
+        self.stats: Dict[str, int] = {}
+
+    def load(self) -> bool:
+        """Load a previous run's progress; False if there is none"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        if state["sources"] != self.sources:
+            raise ValueError(
+                f"Checkpoint {self.path} belongs to other sources: {state['sources']}"
+            )
+        self.offset = state["offset"]
+        self.stats = state.get("stats", {})
+        return True
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "sources": self.sources,
+                    "offset": self.offset,
+                    "stats": self.stats,
+                    "updated_at": datetime.utcnow().isoformat(),
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+
+
+class Ingestor:
+    """
+    Crawl, score and store source items with bounded parallelism
+
+    A reader feeds items to concurrent workers, and one writer flushes their
+    documents in bulk. The checkpoint offset only advances over the
+    contiguous run of items whose documents are written, so items still in
+    flight are redone after a crash.
+    """
+
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        concurrency: int = CRAWL_CONCURRENCY,
+        batch_size: int = 1000,
+        skip_existing: bool = True,
+        report_interval: float = 10.0,
+    ):
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.skip_existing = skip_existing
+        self.report_interval = report_interval
+        self.crawler = get_crawler()
+        # skipped: stored before the crawl; existing: found stored at write
+        self.stats = {
+            "read": 0,
+            "inserted": 0,
+            "existing": 0,
+            "skipped": 0,
+            "failed": 0,
+        }
+        # Totals of earlier runs resumed from the checkpoint
+        self._previous_stats = dict(checkpoint.stats)
+        self._items: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+        self._results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+        self._started = time.monotonic()
+        self._reported_at = self._started
+        self._reported_done = 0
+
+    async def _read(self, items: Iterator[Item]):
+        """Queue items after the checkpoint, skipping URLs already stored"""
+        index = self.checkpoint.offset
+        items = islice(items, index, None)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(lambda: list(islice(items, READ_CHUNK)))
+                if not chunk:
+                    break
+
+                existing: Set[str] = set()
+                if self.skip_existing:
+                    existing = await queries.get_existing_urls(
+                        [url for url, _ in chunk]
+                    )
+                for url, path in chunk:
+                    self.stats["read"] += 1
+                    if url in existing:
+                        await self._results.put((index, "skipped", None))
+                    else:
+                        await self._items.put((index, url, path))
+                    index += 1
+        finally:
+            # Workers stop even if reading a source failed
+            for _ in range(self.concurrency):
+                await self._items.put(None)
+
+    async def _load_page(self, url: str, path: Optional[str]) -> Optional[Dict]:
+        if path is None:
+            return await self.crawler.crawl_url_async(url)
+
+        def read():
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return f.read()
+
+        html_content = await asyncio.to_thread(read)
+        return await get_cpu_pool().run(parse_page, html_content, url)
+
+    async def _work(self):
+        while True:
+            job = await self._items.get()
+            if job is None:
+                break
+            index, url, path = job
+            try:
+                page = await self._load_page(url, path)
+                if page:
+                    await self._results.put(
+                        (index, "page", build_url_document(url, page))
+                    )
+                    continue
+            except Exception as e:
+                logger.error(f"❌ Error ingesting {url}: {e}")
+            await self._results.put((index, "failed", None))
+
+    async def _store(self, docs: List[Dict]) -> Dict[str, str]:
+        """Bulk write documents, retrying while the write fails outright"""
+        for attempt in range(WRITE_ATTEMPTS):
+            url_ids = await queries.bulk_upsert_urls(docs, update_index=False)
+            if url_ids is not None:
+                return url_ids
+            if attempt + 1 < WRITE_ATTEMPTS:
+                await asyncio.sleep(2**attempt)
+        raise RuntimeError(
+            f"Bulk write of {len(docs)} documents failed {WRITE_ATTEMPTS} times;"
+            f" stopping at checkpoint {self.checkpoint.offset}"
+        )
+
+    async def _write(self, workers: List[asyncio.Task], reader: asyncio.Task):
+        """Flush documents in bulk and advance the checkpoint"""
+        # (source index, document, failed writes so far)
+        buffered: List[Tuple[int, Dict, int]] = []
+        done: Set[int] = set()
+        since_flush = 0
+
+        async def flush():
+            if buffered:
+                url_ids = await self._store([doc for _, doc, _ in buffered])
+                retry = []
+                for index, doc, failures in buffered:
+                    url_id = url_ids.get(doc["url"])
+                    if url_id is None:
+                        if failures + 1 < WRITE_ATTEMPTS:
+                            retry.append((index, doc, failures + 1))
+                            continue
+                        logger.error(f"❌ Could not store {doc['url']}")
+                        self.stats["failed"] += 1
+                    elif url_id == str(doc["_id"]):
+                        self.stats["inserted"] += 1
+                    else:
+                        # Stored before, by another process or earlier in
+                        # this batch
+                        self.stats["existing"] += 1
+                    done.add(index)
+                buffered[:] = retry
+
+            while self.checkpoint.offset in done:
+                done.remove(self.checkpoint.offset)
+                self.checkpoint.offset += 1
+            self.checkpoint.stats = {
+                key: self._previous_stats.get(key, 0) + value
+                for key, value in self.stats.items()
+            }
+            self.checkpoint.save()
+
+        running = True
+        while running:
+            try:
+                index, outcome, doc = await asyncio.wait_for(
+                    self._results.get(), timeout=1.0
+                )
+                if outcome == "page":
+                    buffered.append((index, doc, 0))
+                else:
+                    self.stats[outcome] += 1
+                    done.add(index)
+                since_flush += 1
+            except asyncio.TimeoutError:
+                running = (
+                    not (reader.done() and all(worker.done() for worker in workers))
+                    or not self._results.empty()
+                )
+
+            # Runs of skipped or failed items advance the checkpoint too
+            if since_flush >= self.batch_size or not running:
+                await flush()
+                since_flush = 0
+                # Documents rejected individually are retried before exiting
+                while buffered and not running:
+                    await flush()
+            self._report(final=not running)
+
+    def _report(self, final: bool = False):
+        now = time.monotonic()
+        if not final and now - self._reported_at < self.report_interval:
+            return
+
+        processed = sum(
+            self.stats[key] for key in ("inserted", "existing", "skipped", "failed")
+        )
+        elapsed = now - self._started
+        interval_rate = (processed - self._reported_done) / max(
+            now - self._reported_at, 1e-9
+        )
+        print(
+            f"{'done' if final else 'progress'}: {processed} items"
+            f" ({self.stats['inserted']} inserted, {self.stats['existing']} existing,"
+            f" {self.stats['skipped']} skipped, {self.stats['failed']} failed)"
+            f" in {elapsed:.0f}s,"
+            f" {processed / max(elapsed, 1e-9):.1f} items/s overall,"
+            f" {interval_rate:.1f} items/s now, checkpoint at {self.checkpoint.offset}",
+            file=sys.stderr,
+            flush=True,
+        )
+        self._reported_at = now
+        self._reported_done = processed
+
+    async def run(self, items: Iterator[Item]) -> Dict[str, int]:
+        reader = asyncio.create_task(self._read(items))
+        workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        try:
+            await self._write(workers, reader)
+            await reader
+        finally:
+            reader.cancel()
+            for worker in workers:
+                worker.cancel()
+        return self.stats
+
+
+async def ingest(args: argparse.Namespace) -> Dict[str, int]:
+    sources = [os.path.abspath(source) for source in args.sources]
+    checkpoint = Checkpoint(args.checkpoint, sources)
+    if not args.restart and checkpoint.load():
+        print(f"Resuming after {checkpoint.offset} items", file=sys.stderr)
+
+    ingestor = Ingestor(
+        checkpoint,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        skip_existing=not args.no_skip_existing,
+        report_interval=args.report_interval,
+    )
+    await connect_to_mongo()
+    try:
+        # Vectors and duplicate detection match pages crawled by /search
+        get_corpus_model().load_latest()
+        await warm_duplicate_index()
+        return await ingestor.run(iter_sources(sources, args.base_url))
+    finally:
+        await ingestor.crawler.close()
+        get_cpu_pool().shutdown()
+        await close_mongo()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest pages into the corpus")
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        help="URL list files, sitemap files (.xml, .xml.gz) or HTML dump directories",
+    )
+    parser.add_argument(
+        "--base-url",
+        help="URL prefix for files in HTML dump directories (default: file:// URLs)",
+    )
+    parser.add_argument("--checkpoint", default="ingest.checkpoint")
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore an existing checkpoint"
+    )
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY)
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="Documents per bulk write"
+    )
+    parser.add_argument(
+        "--no-skip-existing",
+        action="store_true",
+        help="Crawl URLs even if they are already stored (they are left unchanged)",
+    )
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    asyncio.run(ingest(args))
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())